@@ -0,0 +1,43 @@
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("HUMBLE_HELPER_FAKE_BEDROCK", "1")
+from streamlit.testing.v1 import AppTest
+
+#Time of one script rerun of chatbot.py (what every click or keystroke costs) against conversation length.
+#Runs headless through Streamlit's AppTest with the fake Bedrock client; no model calls are made.
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chatbot.py")
+
+def conversation(turns):
+    messages = [{"role": "assistant", "content": "Hi! I’m Humboldt Helper. How can I assist you?"}]
+    for n in range(turns):
+        messages.append({"role": "user", "content": f"[Research] Question number {n} about research funding deadlines?"})
+        messages.append({"role": "assistant", "content": f"Answer {n}: " + "Here are the steps to follow for this request. " * 12})
+    return messages
+
+def rerun_seconds(turns, repeat):
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.session_state["messages"] = conversation(turns)
+    at.run()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - start)
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return samples
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark chatbot.py rerun time.")
+    parser.add_argument("--turns", type=int, nargs="+", default=[0, 10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    for turns in args.turns:
+        samples = rerun_seconds(turns, args.repeat)
+        print(f"{turns:>4} turns  median {statistics.median(samples) * 1000:7.1f} ms  "
+              f"min {min(samples) * 1000:7.1f} ms")
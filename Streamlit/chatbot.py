@@ -1,18 +1,41 @@
 import streamlit as st
-import boto3
 import base64
 import os
-from typing import List, Dict, Any
+import sys
+import time
+from typing import List, Dict, Any, Iterator, Optional
+
+# Shared modules (answer cache, retrieval) live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import telemetry
+from answer_cache import AnswerCache
+from bedrock_client import METRICS, BedrockClient, BedrockError, get_client
+from context_window import ContextWindow, extractive_summary
+
+MODEL_ID = "anthropic.claude-3-5-sonnet-20241022-v2:0"
+CHAT_CACHE_KB = "chat"
+# Stream answers token by token (set HUMBLE_HELPER_STREAMING=0 for the old blocking call)
+STREAMING = os.environ.get("HUMBLE_HELPER_STREAMING", "1") != "0"
+# Use the local fake client instead of AWS (HUMBLE_HELPER_FAKE_BEDROCK=1)
+FAKE_BEDROCK = os.environ.get("HUMBLE_HELPER_FAKE_BEDROCK") == "1"
+# Input tokens per request; older turns are folded into a rolling summary by a smaller model
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("HUMBLE_HELPER_CONTEXT_BUDGET", "3000"))
+SUMMARY_MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
+# "Auto" lets kb_router.py pick the topic; routes without a topic here (or low confidence) send the bare question
+AUTO_CATEGORY = "Auto"
+ROUTE_CATEGORIES = {"general": "Research", "meetings": "Meeting Minutes"}
 
 # --- Page Setup ---
 st.set_page_config(page_title="Humboldt Helper", layout="wide")
 
 # --- Google Fonts ---
-st.markdown("""
+FONTS_HTML = """
 <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300&family=Poppins:wght@600&display=swap" rel="stylesheet">
-""", unsafe_allow_html=True)
+"""
 
 # --- Load and Encode Image ---
+# Read and encoded once per process, not on every rerun
+@st.cache_data
 def get_base64_image(image_path: str) -> str:
     with open(image_path, "rb") as img_file:
         return base64.b64encode(img_file.read()).decode()
@@ -25,12 +48,13 @@ image_path = os.path.join(streamlit_path, "images", "Logo.png")
 user_icon_path = os.path.join(streamlit_path, "images", "user_icon.png")
 bot_icon_path = os.path.join(streamlit_path, "images", "robot_icon.png")
 
-logo_base64 = get_base64_image(image_path)
-user_icon = get_base64_image(user_icon_path)
-bot_icon = get_base64_image(bot_icon_path)
-
 # --- Custom CSS Styling ---
-st.markdown(f"""
+# Avatars are inlined here once as background images, so message bubbles stay small
+@st.cache_data
+def page_css(user_icon_path: str, bot_icon_path: str) -> str:
+    user_icon = get_base64_image(user_icon_path)
+    bot_icon = get_base64_image(bot_icon_path)
+    return f"""
 <style>
 .fixed-sidebar {{
     position: fixed;
@@ -108,12 +132,22 @@ header[data-testid="stHeader"]::after {{
     margin-bottom: 1.25rem;
 }}
 
-.message-bubble img {{
+.avatar {{
+    flex-shrink: 0;
     width: 38px;
     height: 38px;
     border-radius: 50%;
     margin-right: 12px;
     margin-top: 4px;
+    background-size: cover;
+}}
+
+.avatar-user {{
+    background-image: url("data:image/png;base64,{user_icon}");
+}}
+
+.avatar-assistant {{
+    background-image: url("data:image/png;base64,{bot_icon}");
 }}
 
 .message-content {{
@@ -160,10 +194,13 @@ header[data-testid="stHeader"]::after {{
     background-color: #333;
 }}
 </style>
-""", unsafe_allow_html=True)
+"""
 
 # --- Sidebar ---
-st.markdown(f"""
+@st.cache_data
+def sidebar_html(image_path: str) -> str:
+    logo_base64 = get_base64_image(image_path)
+    return f"""
 <div class="fixed-sidebar">
     <div>
         <div style="text-align: center; margin-top: 2rem; margin-bottom: 2.5rem;">
@@ -182,10 +219,10 @@ st.markdown(f"""
         </div>
     </div>
 </div>
-""", unsafe_allow_html=True)
+"""
 
 # --- Main Header ---
-st.markdown("""
+HEADER_HTML = """
 <div class="main-content">
     <div class="main-title">Humboldt Helper</div>
     <p class="instruction">
@@ -193,29 +230,143 @@ st.markdown("""
     </p>
     <div class="subtitle">Let the exploration begin.</div>
 </div>
-""", unsafe_allow_html=True)
+"""
+
+# Page chrome goes out as one element; everything in it is built once per process
+st.markdown(FONTS_HTML + page_css(user_icon_path, bot_icon_path) + sidebar_html(image_path) + HEADER_HTML,
+            unsafe_allow_html=True)
 
 # --- Claude Model Call ---
 @st.cache_resource
 def get_bedrock_client() -> Any:
-    return boto3.client('bedrock-runtime', region_name='us-west-2')
+    # Both go through the shared client layer, so the fake also exercises the in-flight cap and metrics
+    if FAKE_BEDROCK:
+        from fake_bedrock import FakeBedrockRuntime
+        return BedrockClient(FakeBedrockRuntime())
+    return get_client('bedrock-runtime')
 
-def invoke_model(messages: List[Dict[str, str]]) -> str:
-    client = get_bedrock_client()
-    bedrock_messages = [{
+@st.cache_resource
+def get_answer_cache() -> AnswerCache:
+    return AnswerCache()
+
+@st.cache_resource
+def get_router() -> Any:
+    from kb_router import default_router
+    return default_router()
+
+def route_category(query: str) -> Optional[str]:
+    route, _ = get_router().route(query)
+    return ROUTE_CATEGORIES.get(route)
+
+def conversation_cache_key(messages: List[Dict[str, str]]) -> Optional[str]:
+    # Answers depend on the whole conversation, so the key is every user turn so far.
+    # Opening questions (the common repeat case) share a key across sessions.
+    user_turns = [msg["content"] for msg in messages if msg["role"] == "user"]
+    return "\n".join(user_turns) if user_turns else None
+
+def cached_answer(messages: List[Dict[str, str]], cache_key: str) -> Optional[str]:
+    # Near-identical matching only for opening questions; a shared first turn
+    # would otherwise make every follow-up look like a cached conversation
+    opening = sum(msg["role"] == "user" for msg in messages) == 1
+    return get_answer_cache().get(CHAT_CACHE_KB, MODEL_ID, cache_key, semantic=opening)
+
+def to_bedrock_messages(messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    return [{
         "role": msg["role"],
         "content": [{"text": msg["content"]}]
     } for msg in messages]
 
+def summarize_turns(previous: str, turns: List[Dict[str, str]]) -> str:
+    transcript = "\n".join(f"{msg['role']}: {msg['content']}" for msg in turns)
     try:
-        response = client.converse(
-            modelId="anthropic.claude-3-5-sonnet-20241022-v2:0",
-            messages=bedrock_messages,
-            inferenceConfig={"maxTokens": 1000},
+        response = get_bedrock_client().converse(
+            modelId=SUMMARY_MODEL_ID,
+            system=[{"text": "Update the running summary of a help-desk chat. Keep names, form numbers, dates and open questions. Reply with the summary only, under 150 words."}],
+            messages=[{"role": "user", "content": [{"text": f"Current summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}"}]}],
+            inferenceConfig={"maxTokens": 300},
         )
         return response['output']['message']['content'][0]['text']
-    except Exception as e:
-        return f"❌ Error: {str(e)}"
+    except Exception:
+        return extractive_summary(previous, turns)
+
+@st.cache_resource
+def get_context_window() -> ContextWindow:
+    return ContextWindow(budget=CONTEXT_TOKEN_BUDGET, summarizer=summarize_turns)
+
+def prepare_request(messages: List[Dict[str, str]], metrics: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    # converse/converse_stream arguments for the windowed conversation, prompt size goes into metrics
+    window, system, prompt_stats = get_context_window().build(messages, st.session_state.setdefault("context_state", {}))
+    if metrics is not None:
+        metrics.update(prompt_stats)
+    request = {
+        "modelId": MODEL_ID,
+        "messages": to_bedrock_messages(window),
+        "inferenceConfig": {"maxTokens": 1000},
+    }
+    if system:
+        request["system"] = [{"text": system}]
+    return request
+
+def invoke_model(messages: List[Dict[str, str]], metrics: Optional[Dict[str, Any]] = None) -> str:
+    cache = get_answer_cache()
+    cache_key = conversation_cache_key(messages)
+    if cache_key:
+        cached = cached_answer(messages, cache_key)
+        if cached is not None:
+            return cached
+
+    client = get_bedrock_client()
+    request = prepare_request(messages, metrics)
+
+    start = time.perf_counter()
+    try:
+        with telemetry.span("invoke_model", model=MODEL_ID) as step:
+            response = client.converse(**request)
+            step.add("input_tokens", response.get("usage", {}).get("inputTokens", 0))
+            step.add("output_tokens", response.get("usage", {}).get("outputTokens", 0))
+        answer = response['output']['message']['content'][0]['text']
+    except BedrockError as e:
+        if metrics is not None:
+            metrics["error"] = e.as_dict()
+        return f"❌ {e.user_message()}"
+    if cache_key:
+        cache.put(CHAT_CACHE_KB, MODEL_ID, cache_key, answer, time.perf_counter() - start)
+    return answer
+
+def stream_model(messages: List[Dict[str, str]], metrics: Dict[str, Any]) -> Iterator[str]:
+    # Yields text deltas from converse_stream as they arrive and fills in
+    # metrics["first_token"] / metrics["total"] (seconds) for this request
+    start = time.perf_counter()
+    cache = get_answer_cache()
+    cache_key = conversation_cache_key(messages)
+    if cache_key:
+        cached = cached_answer(messages, cache_key)
+        if cached is not None:
+            metrics.update(first_token=time.perf_counter() - start, total=time.perf_counter() - start, cached=True)
+            yield cached
+            return
+
+    parts = []
+    try:
+        response = get_bedrock_client().converse_stream(**prepare_request(messages, metrics))
+        for event in response["stream"]:
+            if "metadata" in event:
+                metrics["usage"] = event["metadata"].get("usage", {})
+            text = event.get("contentBlockDelta", {}).get("delta", {}).get("text")
+            if text:
+                if not parts:
+                    metrics["first_token"] = time.perf_counter() - start
+                parts.append(text)
+                yield text
+    except BedrockError as e:
+        metrics["total"] = time.perf_counter() - start
+        metrics["error"] = e.as_dict()
+        yield f"❌ {e.user_message()}"
+        return
+
+    metrics["total"] = time.perf_counter() - start
+    if cache_key and parts:
+        cache.put(CHAT_CACHE_KB, MODEL_ID, cache_key, "".join(parts), metrics["total"])
 
 # --- Session State ---
 if "messages" not in st.session_state:
@@ -224,22 +375,42 @@ if "messages" not in st.session_state:
         "content": "Hi! I’m Humboldt Helper. I can help you locate research documents, funding opportunities, and resources regarding research. How can I assist you?"
     }]
 
+if "request_metrics" not in st.session_state:
+    st.session_state.request_metrics = []
+
 # --- Chat Message Display: both left-aligned ---
-for msg in st.session_state.messages:
-    is_user = msg["role"] == "user"
-    avatar = user_icon if is_user else bot_icon
+def message_html(role: str, content: str) -> str:
+    is_user = role == "user"
+    avatar = "avatar-user" if is_user else "avatar-assistant"
     css_class = "message-user" if is_user else "message-assistant"
     sender = "You" if is_user else "Humboldt Helper"
 
-    st.markdown(f"""
+    return f"""
     <div class="message-bubble">
-        <img src="data:image/png;base64,{avatar}">
+        <div class="avatar {avatar}"></div>
         <div class="message-content {css_class}">
             <div style="font-size: 13px; font-weight: bold; margin-bottom: 4px;">{sender}</div>
-            <div style="font-size: 14px; font-family: Inter, sans-serif;">{msg['content']}</div>
+            <div style="font-size: 14px; font-family: Inter, sans-serif;">{content}</div>
         </div>
     </div>
-    """, unsafe_allow_html=True)
+    """
+
+def history_html(messages: List[Dict[str, str]]) -> List[str]:
+    # Each message is rendered once and kept in session state; a rerun only renders what is new
+    rendered = st.session_state.setdefault("message_html", [])
+    if len(rendered) > len(messages):
+        rendered.clear()
+    for msg in messages[len(rendered):]:
+        rendered.append(message_html(msg["role"], msg["content"]))
+    return rendered
+
+# One element per message: joined bubbles would be parsed as one markdown block, and an answer's
+# blank line would end the HTML block and turn the indented markup after it into a code block
+for html in history_html(st.session_state.messages):
+    st.markdown(html, unsafe_allow_html=True)
+
+# New turns are drawn here while the answer streams in, above the input form
+live_area = st.container()
 
 # --- Input Form ---
 with st.form("search_form", clear_on_submit=True):
@@ -247,7 +418,7 @@ with st.form("search_form", clear_on_submit=True):
     col1, col2, col3 = st.columns([1.5, 5, 0.6])
 
     with col1:
-        category = st.selectbox("Select a topic", ["Research", "Meeting Minutes"], key="category_input", label_visibility="collapsed")
+        category = st.selectbox("Select a topic", [AUTO_CATEGORY, "Research", "Meeting Minutes"], key="category_input", label_visibility="collapsed")
 
     with col2:
         query = st.text_input("Enter your question or keywords", placeholder="Ask about meeting minutes or research...", key="query_input", label_visibility="collapsed")
@@ -257,13 +428,51 @@ with st.form("search_form", clear_on_submit=True):
 
     st.markdown('</div>', unsafe_allow_html=True)
 
+if st.session_state.request_metrics:
+    last = st.session_state.request_metrics[-1]
+    prompt_size = (f", prompt {last['prompt_tokens']} of {last['full_tokens']} tokens"
+                   if "prompt_tokens" in last else "")
+    st.caption(f"Last answer: first token {last.get('first_token', last['total']):.2f}s, total {last['total']:.2f}s"
+               + prompt_size + (" (cached)" if last.get("cached") else "")
+               + (f", failed: {last['error']['code']}" if "error" in last else ""))
+    st.caption(METRICS.report())
+
 # --- On Submit ---
 if submitted and query.strip():
-    user_prompt = f"[{category}] {query.strip()}"
+    if category == AUTO_CATEGORY:
+        category = route_category(query)
+    user_prompt = f"[{category}] {query.strip()}" if category else query.strip()
     st.session_state.messages.append({"role": "user", "content": user_prompt})
 
-    with st.spinner("Thinking..."):
-        response = invoke_model(st.session_state.messages)
-
+    if STREAMING:
+        live_area.markdown(message_html("user", user_prompt), unsafe_allow_html=True)
+        bubble = live_area.empty()
+        bubble.markdown(message_html("assistant", "…"), unsafe_allow_html=True)
+        metrics: Dict[str, Any] = {}
+        response = ""
+        # Rendering is timed apart from the model so a slow HTML loop shows up on its own
+        render_seconds = 0.0
+        with telemetry.span("stream_model", model=MODEL_ID) as step:
+            for text in stream_model(st.session_state.messages, metrics):
+                response += text
+                render_start = time.perf_counter()
+                bubble.markdown(message_html("assistant", response), unsafe_allow_html=True)
+                render_seconds += time.perf_counter() - render_start
+            step.set("first_token", metrics.get("first_token"))
+            step.set("cached", metrics.get("cached", False))
+            step.add("render_seconds", render_seconds)
+            step.add("input_tokens", metrics.get("usage", {}).get("inputTokens", 0))
+            step.add("output_tokens", metrics.get("usage", {}).get("outputTokens", 0))
+            if "error" in metrics:
+                step.add("errors")
+                step.set("error", metrics["error"]["code"])
+    else:
+        start = time.perf_counter()
+        metrics = {}
+        with st.spinner("Thinking..."):
+            response = invoke_model(st.session_state.messages, metrics)
+        metrics["total"] = time.perf_counter() - start
+
+    st.session_state.request_metrics.append(metrics)
     st.session_state.messages.append({"role": "assistant", "content": response})
     st.rerun()
@@ -0,0 +1,167 @@
+import argparse
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+
+import telemetry
+
+#SQLite-backed cache of Bedrock answers, shared by george_rag.py and Streamlit/chatbot.py.
+#  exact tier    - key is (kb_id, model, normalized query)
+#  semantic tier - otherwise the closest cached query for the same kb/model is reused when its
+#                  embedding cosine similarity is at least `semantic_threshold` and both queries
+#                  name the same anchors (numbers, acronyms, proper nouns, dates), which a lexical
+#                  embedding cannot tell apart: "NSF grant deadline" must not answer "NIH grant deadline"
+#Entries expire after `ttl` seconds, the least recently used ones are evicted past `max_entries`,
+#and invalidate(kb_id) drops a knowledge base's answers after it is re-synced.
+
+CACHE_PATH = "answer_cache.sqlite3"
+CALENDAR_WORDS = {"january", "february", "march", "april", "may", "june", "july", "august", "september",
+                  "october", "november", "december", "monday", "tuesday", "wednesday", "thursday", "friday",
+                  "saturday", "sunday", "today", "tonight", "tomorrow", "yesterday", "spring", "summer", "fall", "winter"}
+
+def normalize_query(query):
+    query = re.sub(r"\s+", " ", query.lower()).strip()
+    return query.strip(" ?!.,;:")
+
+def anchor_tokens(query):
+    #Words two questions cannot differ in and still share an answer, from the raw (cased) query:
+    #anything with a digit, dates, ALL CAPS acronyms and capitalized words that do not start a sentence
+    anchors = set()
+    for line in query.splitlines():
+        for match in re.finditer(r"[\w/-]+", line):
+            token = match.group()
+            lower = token.lower()
+            before = line[:match.start()].rstrip()
+            sentence_start = not before or before[-1] in ".?!:]"
+            if (any(c.isdigit() for c in token) or lower in CALENDAR_WORDS
+                    or (len(token) >= 2 and token[0].isupper() and (token.isupper() or not sentence_start))):
+                anchors.add(lower)
+    return " ".join(sorted(anchors))
+
+def default_embedder():
+    #The semantic tier needs numpy; without it the cache still works as an exact-match cache
+    try:
+        from local_index import HashingEmbedder
+    except ImportError:
+        return None
+    return HashingEmbedder()
+
+class AnswerCache:
+    def __init__(self, path=CACHE_PATH, max_entries=2000, ttl=7 * 24 * 3600, semantic_threshold=0.95, embedder="default"):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.semantic_threshold = semantic_threshold
+        self.embedder = default_embedder() if embedder == "default" else embedder
+        self.lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "seconds_saved": 0.0}
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS answers (
+            key TEXT PRIMARY KEY, kb_id TEXT, model TEXT, query TEXT, answer TEXT,
+            embedding BLOB, latency REAL, created REAL, last_used REAL)""")
+        try:
+            self.db.execute("ALTER TABLE answers ADD COLUMN anchors TEXT")
+        except sqlite3.OperationalError:
+            pass  # already there; rows cached before it have NULL anchors and only match exactly
+        self.db.execute("CREATE INDEX IF NOT EXISTS answers_kb ON answers (kb_id, model)")
+        self.db.commit()
+
+    @staticmethod
+    def make_key(kb_id, model, normalized):
+        return hashlib.sha256(f"{kb_id}\x00{model}\x00{normalized}".encode()).hexdigest()
+
+    def embed(self, normalized):
+        if self.embedder is None:
+            return None
+        return self.embedder.embed([normalized])[0]
+
+    def hit(self, kind, key, latency, now):
+        self.stats[kind] += 1
+        self.stats["seconds_saved"] += latency or 0.0
+        self.db.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, key))
+        self.db.commit()
+
+    def get(self, kb_id, model, query, semantic=True):
+        #Returns a cached answer or None; semantic=False only accepts an exact match
+        normalized = normalize_query(query)
+        key = self.make_key(kb_id, model, normalized)
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT answer, latency FROM answers WHERE key = ? AND created > ?",
+                                  (key, now - self.ttl)).fetchone()
+            if row:
+                self.hit("exact_hits", key, row[1], now)
+                telemetry.count("answer_cache_lookups", kb=kb_id, result="exact")
+                return row[0]
+
+            vector = self.embed(normalized) if semantic else None
+            if vector is not None:
+                import numpy as np
+                rows = self.db.execute(
+                    "SELECT key, answer, latency, embedding FROM answers WHERE kb_id = ? AND model = ? AND created > ? "
+                    "AND embedding IS NOT NULL AND anchors = ?",
+                    (kb_id, model, now - self.ttl, anchor_tokens(query))).fetchall()
+                if rows:
+                    matrix = np.frombuffer(b"".join(r[3] for r in rows), dtype=np.float32).reshape(len(rows), -1)
+                    scores = matrix @ vector
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.semantic_threshold:
+                        self.hit("semantic_hits", rows[best][0], rows[best][2], now)
+                        telemetry.count("answer_cache_lookups", kb=kb_id, result="semantic")
+                        return rows[best][1]
+
+            self.stats["misses"] += 1
+            telemetry.count("answer_cache_lookups", kb=kb_id, result="miss")
+            return None
+
+    def put(self, kb_id, model, query, answer, latency):
+        normalized = normalize_query(query)
+        vector = self.embed(normalized)
+        blob = vector.astype("float32").tobytes() if vector is not None else None
+        now = time.time()
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO answers (key, kb_id, model, query, answer, embedding, latency, created, last_used, anchors) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            (self.make_key(kb_id, model, normalized), kb_id, model, normalized, answer, blob, latency, now, now,
+                             anchor_tokens(query)))
+            self.evict(now)
+            self.db.commit()
+
+    def evict(self, now):
+        #TTL first, then least recently used rows beyond max_entries
+        self.db.execute("DELETE FROM answers WHERE created <= ?", (now - self.ttl,))
+        self.db.execute("""DELETE FROM answers WHERE key IN (
+            SELECT key FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?)""", (self.max_entries,))
+
+    def invalidate(self, kb_id=None):
+        #Call after a knowledge base is re-synced; no kb_id clears everything
+        with self.lock:
+            if kb_id is None:
+                cursor = self.db.execute("DELETE FROM answers")
+            else:
+                cursor = self.db.execute("DELETE FROM answers WHERE kb_id = ?", (kb_id,))
+            self.db.commit()
+            return cursor.rowcount
+
+    def report(self):
+        s = self.stats
+        lookups = s["exact_hits"] + s["semantic_hits"] + s["misses"]
+        rate = (s["exact_hits"] + s["semantic_hits"]) / lookups if lookups else 0.0
+        return (f"answer cache: {rate:.0%} hit rate over {lookups} lookups "
+                f"({s['exact_hits']} exact, {s['semantic_hits']} semantic), {s['seconds_saved']:.1f}s of model latency saved")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the Bedrock answer cache.")
+    parser.add_argument("command", choices=["stats", "invalidate"])
+    parser.add_argument("kb_id", nargs="?", help="knowledge base to invalidate (default: all)")
+    parser.add_argument("--path", default=CACHE_PATH)
+    args = parser.parse_args()
+
+    cache = AnswerCache(args.path, embedder=None)
+    if args.command == "invalidate":
+        print(f"Removed {cache.invalidate(args.kb_id)} cached answers")
+    else:
+        for kb_id, model, count in cache.db.execute("SELECT kb_id, model, COUNT(*) FROM answers GROUP BY kb_id, model"):
+            print(f"{kb_id:<20} {model:<50} {count}")
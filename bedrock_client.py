@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+import weakref
+from functools import lru_cache
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError, NoCredentialsError
+
+import telemetry
+
+#One place that creates Bedrock clients for george_rag.py, Streamlit/chatbot.py and local_index.py.
+#  - botocore retries in "adaptive" mode: exponential backoff with full jitter, plus a client-side
+#    rate limiter that slows down as soon as Bedrock starts throttling
+#  - connection pools sized for the fan-out thread pools instead of botocore's default of 10
+#  - a process-wide semaphore caps in-flight calls across every client, so a burst of users queues
+#    here instead of turning into ThrottlingException
+#  - failures come back as BedrockError (code, throttled, retryable) and every call is counted in METRICS
+
+REGION = "us-west-2"
+MAX_IN_FLIGHT = int(os.environ.get("HUMBLE_HELPER_MAX_IN_FLIGHT", "16"))
+MAX_POOL_CONNECTIONS = 32
+MAX_ATTEMPTS = 6
+
+THROTTLING_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException"}
+RETRYABLE_CODES = THROTTLING_CODES | {"ServiceUnavailableException", "InternalServerException",
+                                      "ModelNotReadyException", "ModelTimeoutException"}
+
+_in_flight = threading.BoundedSemaphore(MAX_IN_FLIGHT)
+_session_lock = threading.Lock()
+
+def make_config(**overrides):
+    settings = {
+        "region_name": REGION,
+        "max_pool_connections": MAX_POOL_CONNECTIONS,
+        "retries": {"max_attempts": MAX_ATTEMPTS, "mode": "adaptive"},
+        "connect_timeout": 5,
+        "read_timeout": 60,
+    }
+    settings.update(overrides)
+    return Config(**settings)
+
+class BedrockError(Exception):
+    def __init__(self, code, message, operation=None, throttled=False, retryable=False, status=None):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message
+        self.operation = operation
+        self.throttled = throttled
+        self.retryable = retryable
+        self.status = status
+
+    @classmethod
+    def from_exception(cls, operation, exc):
+        if isinstance(exc, BedrockError):
+            return exc
+        if isinstance(exc, ClientError):
+            error = exc.response.get("Error", {})
+            code = error.get("Code", "ClientError")
+            return cls(code, error.get("Message", str(exc)), operation,
+                       throttled=code in THROTTLING_CODES, retryable=code in RETRYABLE_CODES,
+                       status=exc.response.get("ResponseMetadata", {}).get("HTTPStatusCode"))
+        if isinstance(exc, BotoCoreError):
+            #Connection resets, read timeouts, missing credentials
+            return cls(type(exc).__name__, str(exc), operation, retryable=not isinstance(exc, NoCredentialsError))
+        return cls(type(exc).__name__, str(exc), operation)
+
+    def as_dict(self):
+        return {"code": self.code, "message": self.message, "operation": self.operation,
+                "throttled": self.throttled, "retryable": self.retryable, "status": self.status}
+
+    def user_message(self):
+        if self.throttled:
+            return "The assistant is busy right now. Please try again in a few seconds."
+        if self.retryable:
+            return "The assistant could not be reached. Please try again."
+        return f"Something went wrong ({self.code}). {self.message}"
+
+class ClientMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.calls = {}
+        self.errors = {}
+        self.retries = 0
+        self.throttled = 0
+        self.queue_seconds = 0.0
+        self.call_seconds = 0.0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def started(self, queued):
+        with self.lock:
+            self.queue_seconds += queued
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def finished(self, operation, seconds, retries=0, error=None):
+        with self.lock:
+            self.in_flight -= 1
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+            self.call_seconds += seconds
+            self.retries += retries
+            if error is not None:
+                self.errors[error.code] = self.errors.get(error.code, 0) + 1
+                self.throttled += error.throttled
+        telemetry.count("bedrock_calls", operation=operation, outcome=error.code if error else "ok")
+        if retries:
+            telemetry.count("bedrock_retries", retries, operation=operation)
+
+    def snapshot(self):
+        with self.lock:
+            return {"calls": dict(self.calls), "errors": dict(self.errors), "retries": self.retries,
+                    "throttled": self.throttled, "queue_seconds": round(self.queue_seconds, 3),
+                    "call_seconds": round(self.call_seconds, 3), "in_flight": self.in_flight,
+                    "peak_in_flight": self.peak_in_flight}
+
+    def report(self):
+        s = self.snapshot()
+        calls = sum(s["calls"].values())
+        errors = sum(s["errors"].values())
+        return (f"bedrock: {calls} calls, {errors} errors ({s['throttled']} throttled), {s['retries']} retries, "
+                f"peak {s['peak_in_flight']} in flight, {s['queue_seconds']:.1f}s queued")
+
+METRICS = ClientMetrics()
+
+def retry_attempts(payload):
+    return payload.get("ResponseMetadata", {}).get("RetryAttempts", 0) if isinstance(payload, dict) else 0
+
+class BedrockClient:
+    #Wraps a boto3 (or fake) client: every API call takes a slot from the shared semaphore,
+    #is timed into METRICS and raises BedrockError on failure
+    def __init__(self, client, semaphore=_in_flight, metrics=METRICS):
+        self.client = client
+        self.semaphore = semaphore
+        self.metrics = metrics
+
+    def __getattr__(self, operation):
+        method = getattr(self.client, operation)
+        if not callable(method):
+            return method
+
+        def call(**kwargs):
+            queued = time.perf_counter()
+            self.semaphore.acquire()
+            start = time.perf_counter()
+            self.metrics.started(start - queued)
+            try:
+                response = method(**kwargs)
+            except Exception as e:
+                error = BedrockError.from_exception(operation, e)
+                retries = retry_attempts(getattr(e, "response", None))
+                self.semaphore.release()
+                self.metrics.finished(operation, time.perf_counter() - start, retries, error)
+                raise error from e
+            if isinstance(response, dict) and "stream" in response:
+                #The slot is held until the event stream is drained, closed or garbage collected
+                release = self.release_once(operation, start, retry_attempts(response))
+                response["stream"] = self.stream(operation, response["stream"], release)
+                weakref.finalize(response["stream"], release)
+            else:
+                self.semaphore.release()
+                self.metrics.finished(operation, time.perf_counter() - start, retry_attempts(response))
+            return response
+
+        return call
+
+    def release_once(self, operation, start, retries):
+        done = threading.Lock()
+
+        def release(error=None):
+            if done.acquire(blocking=False):
+                self.semaphore.release()
+                self.metrics.finished(operation, time.perf_counter() - start, retries, error)
+        return release
+
+    def stream(self, operation, events, release):
+        try:
+            for event in events:
+                yield event
+        except Exception as e:
+            error = BedrockError.from_exception(operation, e)
+            release(error)
+            raise error from e
+        finally:
+            release()
+
+@lru_cache(maxsize=None)
+def get_client(service="bedrock-runtime"):
+    #Shared per process; boto3 clients are thread-safe once created, creation itself is not
+    with _session_lock:
+        return BedrockClient(boto3.session.Session().client(service, config=make_config()))
@@ -0,0 +1,87 @@
+import argparse
+import re
+import time
+
+import numpy as np
+
+from kb_router import KEYWORD_RULES, KBRouter, SEED_QUERIES, read_query_log
+
+#Accuracy and per-query latency of kb_router.py on labelled queries it was not trained on.
+#Pass a held-out query log (same JSONL format as the training logs) or use the built-in set below.
+#"fallback" counts queries sent to multi-KB search; they cost latency but never a wrong answer.
+
+#Written so that none of them hits a KEYWORD_RULES pattern or repeats a seed query, so the score is the
+#linear model generalizing rather than the rules matching their own vocabulary
+HELD_OUT = [
+    ("What time do the book stacks close on Saturdays?", "general"),
+    ("How much does it cost to leave my car in the lot for a semester?", "general"),
+    ("What scholarships can first-year students get?", "general"),
+    ("Is there a dorm for students transferring in?", "general"),
+    ("How do I change my major?", "general"),
+    ("Where can I get a student ID card?", "general"),
+    ("What is the last day to withdraw from a course?", "general"),
+    ("Who can help me with a FAFSA question?", "general"),
+    ("What did the trustees decide about enrollment targets?", "meetings"),
+    ("Was the general education proposal voted on?", "meetings"),
+    ("Which board members were present in March?", "meetings"),
+    ("What did the faculty body discuss last spring?", "meetings"),
+    ("Did the trustees adopt the new strategic plan?", "meetings"),
+    ("What resolutions were passed about the budget?", "meetings"),
+    ("Who chaired the curriculum session in October?", "meetings"),
+    ("How do I split a purchasing card charge across funding codes?", "peoplesoft"),
+    ("My expense report is stuck waiting for sign-off", "peoplesoft"),
+    ("How do I enter hours worked for my student employee?", "peoplesoft"),
+    ("Where do I find the journal entry for a department transfer?", "peoplesoft"),
+    ("How do I look up my department ID in the finance system?", "peoplesoft"),
+    ("How do I create a purchase order for a vendor?", "peoplesoft"),
+    ("How do I run the monthly card statement report?", "peoplesoft"),
+    ("Where do I change my direct deposit in the HR system?", "peoplesoft"),
+]
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q)) * 1000
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the knowledge base router.")
+    parser.add_argument("held_out", nargs="?", help="JSONL query log to evaluate on (default: built-in set)")
+    parser.add_argument("--train", nargs="*", default=[], help="extra query logs to train on")
+    parser.add_argument("--repeat", type=int, default=50, help="timing passes over the evaluation set")
+    args = parser.parse_args()
+
+    examples = list(SEED_QUERIES)
+    for path in args.train:
+        examples += read_query_log(path)
+    evaluation = read_query_log(args.held_out) if args.held_out else HELD_OUT
+
+    #Queries a rule or the training set already covers say little about how the router generalizes
+    rules = [re.compile(pattern, re.IGNORECASE) for pattern in KEYWORD_RULES.values()]
+    seen = {query.lower() for query, _ in examples}
+    overlap = [query for query, _ in evaluation if query.lower() in seen or any(rule.search(query) for rule in rules)]
+    if overlap:
+        print(f"[WARNING] {len(overlap)} of {len(evaluation)} evaluation queries match a keyword rule or a training query")
+
+    start = time.perf_counter()
+    router = KBRouter().fit(examples)
+    print(f"Trained on {len(examples)} queries in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    correct = wrong = fallback = 0
+    for query, expected in evaluation:
+        route, confidence = router.route(query)
+        if route is None:
+            fallback += 1
+        elif route == expected:
+            correct += 1
+        else:
+            wrong += 1
+            print(f"  wrong: {query!r} -> {route} ({confidence:.2f}), expected {expected}")
+    routed = correct + wrong
+    print(f"{len(evaluation)} queries: {correct} correct, {wrong} wrong, {fallback} fallback to all KBs")
+    print(f"accuracy when routed {correct / routed if routed else 0.0:.1%}, coverage {routed / len(evaluation):.1%}")
+
+    latencies = []
+    for _ in range(args.repeat):
+        for query, _ in evaluation:
+            start = time.perf_counter()
+            router.route(query)
+            latencies.append(time.perf_counter() - start)
+    print(f"route() p50 {percentile_ms(latencies, 50):.3f} ms  p99 {percentile_ms(latencies, 99):.3f} ms  max {max(latencies) * 1000:.3f} ms")
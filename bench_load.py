@@ -0,0 +1,251 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("HUMBLE_HELPER_FAKE_BEDROCK", "1")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Streamlit"))
+
+from streamlit import config as streamlit_config, logger as streamlit_logger
+
+# Both apps run in Streamlit bare mode here, which warns on every cache and session_state access
+streamlit_config.set_option("logger.level", "error")
+streamlit_logger.set_log_level("error")
+
+import george_rag
+from bedrock_client import METRICS, BedrockClient, BedrockError
+from fake_bedrock import FakeBedrockAgentRuntime, FakeBedrockRuntime
+
+#Load test for george_rag.query_knowledge_base / query_all_knowledge_bases and the chatbot's
+#invoke_model / stream_model, against scripted fake Bedrock clients (see fake_bedrock.py), so a prompt or
+#retrieval change that slows answers down or trips throttling shows up before it is deployed.
+#Queries are replayed open-loop: request i is due at start + i / qps however slow earlier ones were, and its
+#latency is measured from that moment, so queueing in the app (in-flight cap, fan-out pool) lands in the
+#percentiles instead of quietly lowering the offered load.
+#Corpus: JSONL of {"query", "kb"} (a KB id, "ALL" for search-all, or "chat" for the chatbot) or the router's
+#query_log.jsonl ({"query", "route"}); defaults to kb_router.SEED_QUERIES.
+#Fake behaviour comes from the flags below or --script, a JSON file of FakeBedrockRuntime ("runtime") and
+#FakeBedrockAgentRuntime ("agent") keyword arguments, e.g. {"agent": {"kb_delays": {"IYGP2BMJEG": 1.2}}}.
+#  python bench_load.py --qps 20 --requests 400 --throttle-rate 0.02 --json load.json --max-p95 4
+
+CHAT_TARGET = "chat"
+
+class NullCache:
+    #Every request goes to the (fake) model, otherwise a replayed corpus turns into cache hits
+    def get(self, *args, **kwargs):
+        return None
+
+    def put(self, *args, **kwargs):
+        pass
+
+    def report(self):
+        return "answer cache disabled"
+
+def route_targets():
+    return {config["route"]: config["kb_id"] for config in george_rag.KB_OPTIONS.values() if config.get("route")}
+
+def load_corpus(path=None):
+    #[(query, target)]; target is a KB id, george_rag.SEARCH_ALL_KB_ID or CHAT_TARGET
+    routes = route_targets()
+    if path is None:
+        from kb_router import SEED_QUERIES
+        return [(query, routes.get(route, george_rag.SEARCH_ALL_KB_ID)) for query, route in SEED_QUERIES]
+    corpus = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("query"):
+                corpus.append((entry["query"], entry.get("kb") or routes.get(entry.get("route"), george_rag.SEARCH_ALL_KB_ID)))
+    return corpus
+
+def make_fakes(args):
+    behaviour = {"jitter": args.jitter, "throttle_rate": args.throttle_rate, "error_rate": args.error_rate,
+                 "max_concurrency": args.max_concurrency, "seed": args.seed}
+    runtime = dict(behaviour, first_token_delay=args.first_token_delay, token_delay=args.token_delay)
+    agent = dict(behaviour, retrieve_delay=args.retrieve_delay, generate_delay=args.generate_delay,
+                 kb_delays=dict(args.kb_delay))
+    if args.script:
+        with open(args.script, encoding="utf-8") as f:
+            script = json.load(f)
+        runtime.update(script.get("runtime", {}))
+        agent.update(script.get("agent", {}))
+    return FakeBedrockRuntime(**runtime), FakeBedrockAgentRuntime(**agent)
+
+def install(runtime, agent, cache):
+    #Points both apps at the fakes; the BedrockClient wrapper keeps the real in-flight cap and error mapping
+    import chatbot
+    george_rag.bedrock_agent = BedrockClient(agent)
+    george_rag.bedrock_runtime = BedrockClient(runtime)
+    george_rag.get_answer_cache = lambda: cache
+    chat_client = BedrockClient(runtime)
+    chatbot.get_bedrock_client = lambda: chat_client
+    chatbot.get_answer_cache = lambda: cache
+    return chatbot
+
+def run_request(chatbot, query, target, stream=False):
+    #One user request; returns (error or None, seconds to first token or None)
+    metrics = {}
+    if target == CHAT_TARGET:
+        messages = [{"role": "user", "content": query}]
+        if stream:
+            for _ in chatbot.stream_model(messages, metrics):
+                pass
+        else:
+            chatbot.invoke_model(messages, metrics)
+        error = metrics.get("error")
+        return (BedrockError(**error) if error else None), metrics.get("first_token")
+    try:
+        if target == george_rag.SEARCH_ALL_KB_ID:
+            george_rag.query_all_knowledge_bases(query, metrics=metrics)
+        else:
+            george_rag.query_knowledge_base(target, query, metrics=metrics)
+    except BedrockError as e:
+        return e, None
+    return None, None
+
+def replay(chatbot, corpus, qps, requests, threads=32, stream=False, poisson=False, seed=None):
+    #Submits requests on schedule from this thread, the pool plays the concurrent users.
+    #Returns [(target, latency seconds, error, first token seconds)] and the wall time.
+    arrivals = random.Random(seed)
+    samples = []
+    lock = threading.Lock()
+
+    def user(query, target, due):
+        try:
+            error, first_token = run_request(chatbot, query, target, stream)
+        except Exception as e:
+            #Nobody reads the pool's futures, so anything else a request raises has to be counted here
+            error, first_token = BedrockError.from_exception(None, e), None
+        with lock:
+            samples.append((target, time.perf_counter() - due, error, first_token))
+
+    start = time.perf_counter()
+    due = start
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="load") as pool:
+        for i in range(requests):
+            query, target = corpus[i % len(corpus)]
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(user, query, target, due)
+            due += arrivals.expovariate(qps) if poisson else 1.0 / qps
+    return samples, time.perf_counter() - start
+
+def percentile(values, p):
+    #Nearest rank on sorted values: the smallest value with at least p% of the values at or below it
+    if not values:
+        return None
+    return values[max(0, math.ceil(p * len(values) / 100.0) - 1)]
+
+def summarize(samples, seconds):
+    #{target: stats} plus "total" over every request
+    groups = {}
+    for sample in samples:
+        groups.setdefault(sample[0], []).append(sample)
+    groups["total"] = samples
+    summary = {}
+    for target, group in groups.items():
+        latencies = sorted(s[1] for s in group)
+        errors = [s[2] for s in group if s[2] is not None]
+        first_tokens = sorted(s[3] for s in group if s[3] is not None)
+        codes = {}
+        for e in errors:
+            codes[e.code] = codes.get(e.code, 0) + 1
+        summary[target] = {
+            "requests": len(group),
+            "throughput": len(group) / seconds if seconds else 0.0,
+            "p50": percentile(latencies, 50), "p95": percentile(latencies, 95), "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else None,
+            "first_token_p50": percentile(first_tokens, 50), "first_token_p95": percentile(first_tokens, 95),
+            "error_rate": len(errors) / len(group) if group else 0.0,
+            "throttle_rate": sum(e.throttled for e in errors) / len(group) if group else 0.0,
+            "errors": codes,
+        }
+    return summary
+
+def latency(seconds):
+    #Percentiles are None for a target without requests (e.g. --requests 0)
+    return f"{seconds:>7.3f}" if seconds is not None else f"{'-':>7}"
+
+def report(summary):
+    lines = [f"{'kb':<12} {'reqs':>5} {'req/s':>6} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'errors':>7} {'throttled':>9}"]
+    for target, s in sorted(summary.items(), key=lambda item: item[0] == "total"):
+        lines.append(f"{target:<12} {s['requests']:>5} {s['throughput']:>6.2f} {latency(s['p50'])} {latency(s['p95'])} "
+                     f"{latency(s['p99'])} {s['error_rate']:>7.1%} {s['throttle_rate']:>9.1%}"
+                     + (f"  first token p50 {s['first_token_p50']:.3f}s p95 {s['first_token_p95']:.3f}s"
+                        if s["first_token_p50"] is not None else ""))
+    return "\n".join(lines)
+
+def failures(summary, max_p95=None, max_error_rate=None):
+    problems = []
+    for target, s in summary.items():
+        if max_p95 is not None and s["p95"] is not None and s["p95"] > max_p95:
+            problems.append(f"{target}: p95 {s['p95']:.3f}s over {max_p95}s")
+        if max_error_rate is not None and s["error_rate"] > max_error_rate:
+            problems.append(f"{target}: error rate {s['error_rate']:.1%} over {max_error_rate:.1%}")
+    return problems
+
+def kb_delay(value):
+    kb_id, _, seconds = value.partition("=")
+    return kb_id, float(seconds)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay queries against george_rag / chatbot with a scripted fake Bedrock.")
+    parser.add_argument("--corpus", help="JSONL of recorded queries (default: the router's seed queries)")
+    parser.add_argument("--app", choices=("rag", "chat"), default="rag", help="chat sends every query to the chatbot")
+    parser.add_argument("--qps", type=float, default=5.0, help="target requests per second")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=32, help="concurrent users")
+    parser.add_argument("--poisson", action="store_true", help="random arrivals instead of evenly spaced ones")
+    parser.add_argument("--stream", action="store_true", help="chat: stream_model instead of invoke_model")
+    parser.add_argument("--cache", action="store_true", help="use a fresh answer cache instead of none")
+    parser.add_argument("--first-token-delay", type=float, default=0.4, help="converse: seconds to first token")
+    parser.add_argument("--token-delay", type=float, default=0.03, help="converse: seconds per streamed chunk")
+    parser.add_argument("--retrieve-delay", type=float, default=0.3, help="knowledge base retrieval seconds")
+    parser.add_argument("--generate-delay", type=float, default=1.5, help="retrieve_and_generate generation seconds")
+    parser.add_argument("--kb-delay", type=kb_delay, action="append", default=[], metavar="KB_ID=SECONDS",
+                        help="retrieval seconds for one knowledge base")
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int, help="fake Bedrock throttles calls beyond this many in flight")
+    parser.add_argument("--script", help="JSON file of fake client keyword arguments")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the summary here")
+    parser.add_argument("--max-p95", type=float, help="exit 1 if any KB's p95 latency (seconds) is above this")
+    parser.add_argument("--max-error-rate", type=float, help="exit 1 if any KB's error rate is above this")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if args.app == "chat":
+        corpus = [(query, CHAT_TARGET) for query, _ in corpus]
+    runtime, agent = make_fakes(args)
+    cache = NullCache()
+    if args.cache:
+        from answer_cache import AnswerCache
+        cache = AnswerCache(os.path.join(tempfile.mkdtemp(), "answer_cache.sqlite3"))
+    chatbot = install(runtime, agent, cache)
+
+    print(f"🚀 {args.requests} requests at {args.qps:g} req/s over {len(corpus)} queries, {args.threads} threads")
+    samples, seconds = replay(chatbot, corpus, args.qps, args.requests, args.threads, args.stream, args.poisson, args.seed)
+    summary = summarize(samples, seconds)
+    print(report(summary))
+    print(METRICS.report())
+    print(cache.report())
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k != "kb_delay"}, "seconds": seconds,
+                       "bedrock": METRICS.snapshot(), "summary": summary}, f, indent=1)
+    problems = failures(summary, args.max_p95, args.max_error_rate)
+    for problem in problems:
+        print(f"❌ {problem}")
+    sys.exit(1 if problems else 0)
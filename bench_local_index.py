@@ -0,0 +1,78 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from local_index import LocalIndex
+
+#Query latency and recall@k of the approximate IVF search against brute force.
+#Pass an index directory built by local_index.py, or let it generate a clustered synthetic one.
+
+def synthetic_index(index_dir, count, dim=512, clusters=200, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=count)] + 0.6 * rng.standard_normal((count, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors.tofile(os.path.join(index_dir, "vectors.f32"))
+    with open(os.path.join(index_dir, "chunks.jsonl"), "w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps({"url": f"synthetic/{i}", "text": ""}) + "\n")
+    with open(os.path.join(index_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"embedder": f"hashing-{dim}", "dim": dim, "count": count}, f)
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q)) * 1000
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark local index search.")
+    parser.add_argument("index_dir", nargs="?")
+    parser.add_argument("--count", type=int, default=100000, help="size of the synthetic index")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    args = parser.parse_args()
+
+    tmp = None
+    index_dir = args.index_dir
+    if not index_dir:
+        tmp = tempfile.TemporaryDirectory()
+        index_dir = tmp.name
+        synthetic_index(index_dir, args.count)
+
+    index = LocalIndex(index_dir)
+    if index.ivf is None:
+        start = time.perf_counter()
+        index.build_ivf()
+        print(f"Built IVF ({len(index.ivf['centroids'])} lists) in {time.perf_counter() - start:.1f}s")
+
+    rng = np.random.default_rng(1)
+    queries = np.asarray(index.vectors[rng.choice(len(index), args.queries, replace=False)])
+    queries += 0.3 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    truth = []
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        truth.append({row for row, _ in index.search_vector(q, args.k)})
+        latencies.append(time.perf_counter() - start)
+    print(f"{len(index)} chunks, {args.queries} queries, k={args.k}")
+    print(f"brute force   p50 {percentile_ms(latencies, 50):7.2f} ms  p95 {percentile_ms(latencies, 95):7.2f} ms  recall 1.000")
+
+    for nprobe in args.nprobe:
+        latencies = []
+        hits = 0
+        for q, expected in zip(queries, truth):
+            start = time.perf_counter()
+            found = {row for row, _ in index.search_vector(q, args.k, approximate=True, nprobe=nprobe)}
+            latencies.append(time.perf_counter() - start)
+            hits += len(found & expected)
+        recall = hits / (len(truth) * args.k)
+        print(f"ivf nprobe={nprobe:<3} p50 {percentile_ms(latencies, 50):7.2f} ms  p95 {percentile_ms(latencies, 95):7.2f} ms  recall {recall:.3f}")
+
+    if tmp:
+        del index
+        tmp.cleanup()
@@ -0,0 +1,45 @@
+import argparse
+import random
+import re
+import time
+
+from url_filter import SOCIAL_MEDIA_DOMAINS, UrlFilter
+
+#Lines per second for the streaming UrlFilter vs. the old rebuild-the-regex-per-call version.
+#Uses a real link dump if given, otherwise a synthetic one built from the humboldt.edu link files.
+
+def old_remove_social_media_urls(text):
+    pattern = r'https?://(?:www\.)?(?:' + '|'.join(re.escape(domain) for domain in SOCIAL_MEDIA_DOMAINS) + r')[^\s]*'
+    return re.sub(pattern, '', text)
+
+def synthetic_lines(count, seed=0):
+    rng = random.Random(seed)
+    hosts = ["www.humboldt.edu", "grants.nih.gov", "policy.humboldt.edu", "www.nsf.gov", "m.facebook.com",
+             "www.youtube.com", "twitter.com", "www.linkedin.com", "library.humboldt.edu"]
+    return [f"https://{rng.choice(hosts)}/path/{rng.randrange(10 ** 6)}\n" for _ in range(count)]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark URL filtering throughput.")
+    parser.add_argument("input", nargs="?", help="link dump to filter (default: synthetic)")
+    parser.add_argument("--lines", type=int, default=500000)
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+    else:
+        lines = synthetic_lines(args.lines)
+
+    start = time.perf_counter()
+    for line in lines:
+        old_remove_social_media_urls(line)
+    old_elapsed = time.perf_counter() - start
+
+    url_filter = UrlFilter()
+    start = time.perf_counter()
+    kept = sum(1 for _ in url_filter.filter_lines(lines))
+    new_elapsed = time.perf_counter() - start
+
+    print(f"{len(lines)} lines, {kept} kept")
+    print(f"regex rebuilt per line  {len(lines) / old_elapsed:12,.0f} lines/s")
+    print(f"UrlFilter (streaming)   {len(lines) / new_elapsed:12,.0f} lines/s")
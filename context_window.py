@@ -0,0 +1,74 @@
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+#Keeps the prompt sent to the chat model inside an input-token budget.
+#  - the greeting (assistant messages before the first user turn) is never sent
+#  - the most recent turns are sent as-is, newest first, until the budget is used up
+#  - everything older is folded into a rolling summary that is only extended, never rebuilt,
+#    so each turn costs at most one small summarization call for the turns that just fell out
+#The summary travels as a system prompt; its tokens count against the same budget.
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD = 4
+SUMMARY_PREFIX = "Summary of the earlier conversation with this user:\n"
+#Distinct message texts whose token counts are remembered; the window is shared by every session
+TOKEN_CACHE_SIZE = 4096
+
+def estimate_tokens(text: str) -> int:
+    #~4 characters per token for English, close enough for budgeting without a tokenizer
+    return len(text) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD
+
+def extractive_summary(previous: str, messages: List[Dict[str, str]], max_chars: int = 1200) -> str:
+    #Fallback summarizer: first sentence of every folded turn, trimmed from the front when too long
+    lines = [previous] if previous else []
+    for msg in messages:
+        first = msg["content"].strip().split(". ")[0][:200]
+        lines.append(f"{'User' if msg['role'] == 'user' else 'Assistant'}: {first}")
+    return "\n".join(lines)[-max_chars:]
+
+class ContextWindow:
+    def __init__(self, budget: int = 3000, summary_budget: int = 400,
+                 summarizer: Optional[Callable[[str, List[Dict[str, str]]], str]] = None,
+                 token_cache_size: int = TOKEN_CACHE_SIZE):
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.summarizer = summarizer or extractive_summary
+        #Bounded LRU, so a long-running server does not keep every message it has ever seen
+        self.tokens: Callable[[str], int] = lru_cache(maxsize=token_cache_size)(estimate_tokens)
+
+    def build(self, messages: List[Dict[str, str]], state: Dict[str, Any]) -> Tuple[List[Dict[str, str]], Optional[str], Dict[str, int]]:
+        #Returns (messages to send, system summary or None, prompt-size stats).
+        #`state` holds the rolling summary between turns (e.g. a dict in st.session_state).
+        first_user = next((i for i, msg in enumerate(messages) if msg["role"] == "user"), len(messages))
+        history = messages[first_user:]
+        covered = state.get("covered", 0)
+        summary = state.get("summary", "")
+        available = self.budget - self.summary_budget
+
+        start = len(history)
+        used = 0
+        while start > 0 and used + self.tokens(history[start - 1]["content"]) <= available:
+            start -= 1
+            used += self.tokens(history[start]["content"])
+        start = min(start, len(history) - 1) if history else 0
+        start = max(start, covered)
+        while start < len(history) - 1 and history[start]["role"] != "user":
+            start += 1
+
+        if start > covered:
+            #Clipped from the front so the summary can never eat into the window's share of the budget
+            max_chars = (self.summary_budget - self.tokens(SUMMARY_PREFIX)) * CHARS_PER_TOKEN
+            summary = self.summarizer(summary, history[covered:start])[-max_chars:]
+            state["summary"] = summary
+            state["covered"] = start
+
+        window = history[start:]
+        system = SUMMARY_PREFIX + summary if summary else None
+        sent = sum(self.tokens(msg["content"]) for msg in window) + (self.tokens(system) if system else 0)
+        stats = {
+            "full_tokens": sum(self.tokens(msg["content"]) for msg in messages),
+            "prompt_tokens": sent,
+            "messages_sent": len(window),
+            "messages_summarized": start,
+        }
+        return window, system, stats
@@ -0,0 +1,170 @@
+import random
+import threading
+import time
+import weakref
+
+from botocore.exceptions import ClientError
+
+#Stand-ins for the boto3 "bedrock-runtime" and "bedrock-agent-runtime" clients so the apps, tests and
+#bench_load.py run without AWS. They implement the parts of converse / converse_stream / retrieve /
+#retrieve_and_generate the app reads, with scripted behaviour:
+#  first_token_delay - seconds before the first text delta (or before converse returns); a number,
+#                      or a callable(call_number) -> seconds for scripted latency curves
+#  token_delay       - seconds between streamed chunks
+#  jitter            - each delay is scaled by a random factor in [1 - jitter, 1 + jitter]
+#  throttle_rate     - share of calls that fail with ThrottlingException, like Bedrock under quota
+#  max_concurrency   - calls beyond this many in flight are throttled as well
+#  error_rate        - share of calls that fail with ServiceUnavailableException
+#Errors are real botocore ClientErrors, so bedrock_client.BedrockError classifies them as it would in production.
+#Use them with HUMBLE_HELPER_FAKE_BEDROCK=1 when starting Streamlit/chatbot.py or george_rag.py.
+
+DEFAULT_REPLY = ("This is a canned answer from the local fake Bedrock client. "
+                 "You asked: {question} "
+                 "In production this text would come from Claude, one chunk at a time.")
+
+class FakeBedrockBase:
+    def __init__(self, first_token_delay=0.4, token_delay=0.03, jitter=0.0, throttle_rate=0.0,
+                 max_concurrency=None, error_rate=0.0, seed=None):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.max_concurrency = max_concurrency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.calls = []
+
+    def delay(self, seconds):
+        if callable(seconds):
+            seconds = seconds(len(self.calls))
+        if self.jitter:
+            with self.lock:
+                seconds *= 1.0 + self.random.uniform(-self.jitter, self.jitter)
+        return max(0.0, seconds)
+
+    def fail(self, code, message, status, operation):
+        raise ClientError({"Error": {"Code": code, "Message": message},
+                           "ResponseMetadata": {"HTTPStatusCode": status}}, operation)
+
+    def begin(self, operation, call):
+        #Records the call and decides whether it is throttled or fails before any work is done
+        self.calls.append(dict(call, api=operation))
+        with self.lock:
+            roll = self.random.random()
+            over = self.max_concurrency is not None and self.in_flight >= self.max_concurrency
+            if not over and roll >= self.throttle_rate + self.error_rate:
+                self.in_flight += 1
+                return
+        if over or roll < self.throttle_rate:
+            self.fail("ThrottlingException", "Too many requests, please wait before trying again.", 429, operation)
+        self.fail("ServiceUnavailableException", "Service unavailable.", 503, operation)
+
+    def end(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def end_once(self):
+        #end() for a call that can finish in more than one place
+        done = threading.Lock()
+
+        def end():
+            if done.acquire(blocking=False):
+                self.end()
+        return end
+
+class FakeBedrockRuntime(FakeBedrockBase):
+    def __init__(self, reply=DEFAULT_REPLY, first_token_delay=0.4, token_delay=0.03, words_per_chunk=2, **behaviour):
+        super().__init__(first_token_delay, token_delay, **behaviour)
+        self.reply = reply
+        self.words_per_chunk = words_per_chunk
+
+    def answer_for(self, messages):
+        question = ""
+        for message in reversed(messages):
+            if message["role"] == "user":
+                question = " ".join(block.get("text", "") for block in message["content"])
+                break
+        return self.reply.format(question=question)
+
+    def usage(self, messages, text):
+        #Rough 4-characters-per-token estimate, close enough for metrics plumbing
+        input_chars = sum(len(block.get("text", "")) for m in messages for block in m["content"])
+        return {"inputTokens": input_chars // 4, "outputTokens": len(text) // 4,
+                "totalTokens": (input_chars + len(text)) // 4}
+
+    def converse(self, modelId, messages, inferenceConfig=None, system=None, **kwargs):
+        self.begin("Converse", {"modelId": modelId, "messages": messages, "system": system})
+        try:
+            start = time.perf_counter()
+            text = self.answer_for(messages)
+            time.sleep(self.delay(self.first_token_delay) + self.delay(self.token_delay) * len(text.split()) / self.words_per_chunk)
+        finally:
+            self.end()
+        return {
+            "output": {"message": {"role": "assistant", "content": [{"text": text}]}},
+            "stopReason": "end_turn",
+            "usage": self.usage(messages, text),
+            "metrics": {"latencyMs": int((time.perf_counter() - start) * 1000)},
+        }
+
+    def converse_stream(self, modelId, messages, inferenceConfig=None, system=None, **kwargs):
+        self.begin("ConverseStream", {"modelId": modelId, "messages": messages, "system": system})
+        #A generator's finally only runs once it has started, so a stream dropped unread is ended when collected
+        end = self.end_once()
+        stream = self.events(messages, end)
+        weakref.finalize(stream, end)
+        return {"stream": stream}
+
+    def events(self, messages, end):
+        try:
+            start = time.perf_counter()
+            text = self.answer_for(messages)
+            words = text.split(" ")
+            yield {"messageStart": {"role": "assistant"}}
+            time.sleep(self.delay(self.first_token_delay))
+            for i in range(0, len(words), self.words_per_chunk):
+                chunk = " ".join(words[i:i + self.words_per_chunk])
+                if i + self.words_per_chunk < len(words):
+                    chunk += " "
+                yield {"contentBlockDelta": {"contentBlockIndex": 0, "delta": {"text": chunk}}}
+                time.sleep(self.delay(self.token_delay))
+            yield {"contentBlockStop": {"contentBlockIndex": 0}}
+            yield {"messageStop": {"stopReason": "end_turn"}}
+            yield {"metadata": {"usage": self.usage(messages, text),
+                                "metrics": {"latencyMs": int((time.perf_counter() - start) * 1000)}}}
+        finally:
+            end()
+
+class FakeBedrockAgentRuntime(FakeBedrockBase):
+    #Knowledge base retrieval; kb_delays overrides retrieval latency per knowledge base id
+    def __init__(self, retrieve_delay=0.3, generate_delay=1.5, kb_delays=None, passages=3, **behaviour):
+        super().__init__(retrieve_delay, 0.0, **behaviour)
+        self.generate_delay = generate_delay
+        self.kb_delays = kb_delays or {}
+        self.passages = passages
+
+    def results(self, kb_id, query, k):
+        return [{"content": {"text": f"Passage {i + 1} from {kb_id} about: {query}"},
+                 "location": {"type": "WEB", "webLocation": {"url": f"https://www.humboldt.edu/{kb_id.lower()}/{i + 1}"}},
+                 "score": 1.0 - i * 0.1} for i in range(min(k, self.passages))]
+
+    def retrieve(self, knowledgeBaseId, retrievalQuery, retrievalConfiguration=None, **kwargs):
+        self.begin("Retrieve", {"knowledgeBaseId": knowledgeBaseId, "query": retrievalQuery["text"]})
+        try:
+            time.sleep(self.delay(self.kb_delays.get(knowledgeBaseId, self.first_token_delay)))
+        finally:
+            self.end()
+        k = (retrievalConfiguration or {}).get("vectorSearchConfiguration", {}).get("numberOfResults", self.passages)
+        return {"retrievalResults": self.results(knowledgeBaseId, retrievalQuery["text"], k)}
+
+    def retrieve_and_generate(self, input, retrieveAndGenerateConfiguration, **kwargs):
+        kb_id = retrieveAndGenerateConfiguration["knowledgeBaseConfiguration"]["knowledgeBaseId"]
+        self.begin("RetrieveAndGenerate", {"knowledgeBaseId": kb_id, "query": input["text"]})
+        try:
+            time.sleep(self.delay(self.kb_delays.get(kb_id, self.first_token_delay)) + self.delay(self.generate_delay))
+        finally:
+            self.end()
+        return {"output": {"text": f"This is a canned answer from the local fake knowledge base {kb_id}. You asked: {input['text']}"},
+                "citations": [{"retrievedReferences": self.results(kb_id, input["text"], self.passages)}]}
@@ -1,112 +1,325 @@
 import streamlit as st
-import boto3
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 
-# Initialize Bedrock Agent Runtime client with us-west-2
-bedrock_agent = boto3.client('bedrock-agent-runtime', region_name='us-west-2')
+import telemetry
+from answer_cache import AnswerCache
+from bedrock_client import METRICS, BedrockClient, BedrockError, get_client
+from context_window import estimate_tokens
+from prompt_templates import format_history, get_template
+from query_log import log_query, query_log_path
+
+# Use the local fake clients instead of AWS (HUMBLE_HELPER_FAKE_BEDROCK=1); bench_load.py swaps in scripted ones
+FAKE_BEDROCK = os.environ.get("HUMBLE_HELPER_FAKE_BEDROCK") == "1"
+if FAKE_BEDROCK:
+    from fake_bedrock import FakeBedrockAgentRuntime, FakeBedrockRuntime
+    bedrock_agent = BedrockClient(FakeBedrockAgentRuntime())
+    bedrock_runtime = BedrockClient(FakeBedrockRuntime())
+else:
+    # Shared Bedrock clients (pooled connections, adaptive retries, capped in-flight calls), us-west-2
+    bedrock_agent = get_client('bedrock-agent-runtime')
+    # Runtime client for generation when passages come from a local index
+    bedrock_runtime = get_client('bedrock-runtime')
+
+MODEL_ID = "anthropic.claude-3-5-sonnet-20240620-v1:0"
+MODEL_ARN = f"arn:aws:bedrock:us-west-2::foundation-model/{MODEL_ID}"
+NUMBER_OF_RESULTS = 3
+# Mark the static system prefix as cacheable on the converse path (only for models with Bedrock prompt caching)
+PROMPT_CACHE_POINT = False
+# "Search all" mode: seconds each KB gets to return passages before it is left out of the answer
+KB_TIMEOUT = 4.0
+# Retrievals one KB may have running at once across all requests. A slow or hung KB fills only its own
+# slots and is then skipped ("busy") instead of tying up the workers every other KB and request needs.
+KB_CONCURRENCY = 4
+SEARCH_ALL = "🔀 Search all knowledge bases"
+SEARCH_ALL_KB_ID = "ALL"
+# Auto mode: kb_router.py picks the KB locally, low-confidence queries fall back to searching all of them
+AUTO_ROUTE = "🧭 Pick the knowledge base for me"
 
 # Set your KB IDs directly here
+# "retrieval" picks where passages come from: "bedrock" lets the KB retrieve them remotely,
+# "local" searches the offline index built with `python local_index.py build ... <local_index>`,
+# "hybrid" fuses BM25 keyword hits with that same vector index (better for form numbers, names, dates)
+# "route" is the kb_router.py label for the KB
 KB_OPTIONS = {
-    "General Questions from Website": "QTYWCMLKR0",  
-    "Meeting Agenda & Minutes": "IYGP2BMJEG",    
-    "PeopleSoft Questions": "A8UGB7Q2ED"
+    "General Questions from Website": {"kb_id": "QTYWCMLKR0", "retrieval": "bedrock", "local_index": "indexes/general", "route": "general"},
+    "Meeting Agenda & Minutes": {"kb_id": "IYGP2BMJEG", "retrieval": "bedrock", "local_index": "indexes/meetings", "route": "meetings"},
+    "PeopleSoft Questions": {"kb_id": "A8UGB7Q2ED", "retrieval": "bedrock", "local_index": "indexes/peoplesoft", "route": "peoplesoft"}
 }
 
-def query_knowledge_base(kb_id, query):
-    systemPrompt = (
-        """You are a query creation agent. The user will provide you a question, and your job is to create a step by step instructions to perform the query. Always start with a brief summary of the query, then provide detailed steps to perform the query. Use the following format in the example below: 
-        <example>
-        The procard reconciliation process is a crucial task for cardholders to ensure that all transactions are accurately recorded and submitted for approval.
-
-        Accessing ProCard Reconciliations in PeopleSoft
+# Repeated (or near-identical) questions are answered from disk instead of Bedrock
+@st.cache_resource
+def get_answer_cache():
+    return AnswerCache()
 
-        ●	Step 1: Receive email notification from AP:
-        ●	Accounts Payable sends monthly email notifications to let cardholders know when reconciliations are available for edits/processing. 
-        ●	Step 2: Access Statement in PeopleSoft
-        ●	Once available, reconciliations can be accessed in PeopleSoft Finance (CFS) through myHumboldt:
-        
-        ●	Once in PeopleSoft Finance, select the Accounts Payable Tile. From there, click the ProCard dropdown that will appear on the left side of your screen. Select “ProCard Adjustment” from the drop down.
+# Shared pool for fan-out retrieval, one worker per KB slot, so an admitted retrieval never queues
+@st.cache_resource
+def get_fanout_pool():
+    return ThreadPoolExecutor(max_workers=KB_CONCURRENCY * len(KB_OPTIONS), thread_name_prefix="kb-fanout")
 
+@st.cache_resource
+def get_router():
+    # Imported here so the Bedrock-only path does not need numpy
+    from kb_router import default_router
+    return default_router()
 
-        ●	From the ProCard Adjustment search screen, you must first select the Business Unit your ProCard falls under by either entering it manually in the Business Unit search bar, or by accessing the full list of Business Units by clicking the magnifying glass at the end of it. 
-        ●	The Origin line must then be filled in the same manner. The Origin line should always be set to USB, regardless of your Business Unit. 
-        ●	Once your Business Unit & Origin are selected, you can search for your reconciliation by entering your first and/or last name and then clicking the blue “Search” button.
+def route_query(query, metrics=None):
+    # KB_OPTIONS name for the query, or None to search all knowledge bases
+    router = get_router()
+    start = time.perf_counter()
+    route, confidence = router.route(query)
+    if metrics is not None:
+        metrics["route"] = {"route": route, "confidence": confidence, "ms": (time.perf_counter() - start) * 1000}
+    for name, config in KB_OPTIONS.items():
+        if route is not None and config.get("route") == route:
+            return name
+    return None
 
-        
+_local_indexes = {}
+_hybrid_indexes = {}
+_kb_slots = {}
+_kb_slots_lock = threading.Lock()
 
-        ●	Once you hit search, you should be automatically taken to the following screen, where your current reconciliation should be available for processing. 
-        
-        ●	Your first transaction of this reconciliation’s cycle will be displayed. To view the next transaction, you can press the arrow keys located in the top right of the Transactions field. You can also select View All to bring up all of your transactions for this cycle at once.
-        
+def kb_config(kb_id):
+    for config in KB_OPTIONS.values():
+        if config["kb_id"] == kb_id:
+            return config
+    return {"kb_id": kb_id, "retrieval": "bedrock"}
 
-        ●	Step 3: Update Descriptions & Chartfields
-        ●	For each transaction, there are two main components you must fill out: the Description, and the Chartfield string. For the Description field, a simple explanation of what the purchase was and what it was for will suffice. 
-        ○	You can add any information that may be helpful to you and your department here as it will show in OBI in the description field. This can support future budget analysis or research on historical transactions.
+def kb_slots(name):
+    with _kb_slots_lock:
+        if name not in _kb_slots:
+            _kb_slots[name] = threading.BoundedSemaphore(KB_CONCURRENCY)
+        return _kb_slots[name]
 
-        
+def get_local_index(index_dir):
+    # Imported here so the Bedrock-only path does not need numpy
+    from local_index import LocalIndex
+    if index_dir not in _local_indexes:
+        _local_indexes[index_dir] = LocalIndex(index_dir)
+    return _local_indexes[index_dir]
 
-        ●	The Chartfield string is entered under the Distribution field. This will already be filled with the default chartfield you entered on your ProCard application. If the charge should be allocated to a different Chartfield, you can change each manually, or search for specific Chartfields using the magnifying glass for each field. Questions regarding what specific Chartfields you should use should be fielded by your department’s Budget Analyst.
-        ●	RECOMMENDED: While filling out these fields, periodically click the blue “Save” button in the bottom right corner to avoid losing any progress.
+def get_hybrid_index(index_dir):
+    from hybrid_search import HybridIndex
+    if index_dir not in _hybrid_indexes:
+        _hybrid_indexes[index_dir] = HybridIndex(index_dir)
+    return _hybrid_indexes[index_dir]
 
-        ●	If you want to distribute multiple amounts within a single expense’s total to different chartfields, you can add/remove rows using +/- signs on the right side of the field. The line items must add up to the expense’s original total, or an error will occur. Example:
+def retrieve_local(config, query, k=NUMBER_OF_RESULTS):
+    if config.get("retrieval") == "hybrid":
+        return get_hybrid_index(config["local_index"]).search(query, k)
+    return get_local_index(config["local_index"]).search(query, k, approximate=config.get("approximate", False))
 
-        ●	Step 4: Generate & Download ProCard Report:
-        ●	Once you have finished filling out the Descriptions & Chartfields for all of your transactions, click the small Print Report button (printer icon) located next to Process Monitor near the top of your screen. Then, click Process Monitor to access your Process List.
-        
+def retrieve_bedrock(kb_id, query, k=NUMBER_OF_RESULTS):
+    # Retrieval only (no generation) against a Bedrock knowledge base
+    response = bedrock_agent.retrieve(
+        knowledgeBaseId=kb_id,
+        retrievalQuery={"text": query},
+        retrievalConfiguration={"vectorSearchConfiguration": {"numberOfResults": k}},
+    )
+    passages = []
+    for result in response.get("retrievalResults", []):
+        location = result.get("location", {})
+        source = (location.get("webLocation", {}).get("url")
+                  or location.get("s3Location", {}).get("uri")
+                  or kb_id)
+        passages.append({"url": source, "text": result["content"]["text"], "score": result.get("score", 0.0)})
+    return passages
 
-        ●	Your ProCard report should appear at the top of this list, with “SQR Report” listed under the Process Type. It typically takes a moment for the report to generate. Click the top right “Refresh” button to refresh the report’s status.Once the report is generated, the Run Status will be “Success”, and the Distribution Status will be “Posted”. Once the report has been generated, click the “Details” hyperlink.
-
-        ●	From the File List, click the hyperlink for the PDF file in the middle of the list. This will download a PDF copy of your ProCard report that will serve as the cover page of your ProCard Reconciliation Submission.
+def retrieve(config, query, k=NUMBER_OF_RESULTS):
+    with telemetry.span("retrieve", kb=config["kb_id"]) as step:
+        if config.get("retrieval") in ("local", "hybrid"):
+            passages = retrieve_local(config, query, k)
+        else:
+            passages = retrieve_bedrock(config["kb_id"], query, k)
+        step.add("passages", len(passages))
+    return passages
 
-        ●	Step 5: Prepare Reconciliation Submission Adobe:
-        ●	Once you have downloaded the report, open both it and any backup documentation files (invoices, receipts, Hospitality forms, Lost Receipt Memos, approvals, etc.) you have in Adobe Acrobat. Once every file is open, select “Combine Files” under Tools, then “Add Open Files”.
-        ●	Once at the Combine screen, you can click and drag each individual document to determine the order they appear in (left-most is first.) Backup documentation should be organized in the same order as their corresponding transactions on your ProCard report.
-        ●	After your documents are in order, hold the Ctrl key and click each file until they are all highlighted, as shown below, and then click combine. (You can also hold click and drag your cursor across the documents to select them all.)
+def merge_passages(results, k):
+    # Scores from different KBs are not comparable, so rank fusion: 1/(60 + rank) summed per passage
+    fused = {}
+    for passages in results:
+        for rank, passage in enumerate(passages):
+            key = (passage["url"], passage["text"][:200])
+            entry = fused.setdefault(key, dict(passage, score=0.0))
+            entry["score"] += 1.0 / (60 + rank + 1)
+    return sorted(fused.values(), key=lambda p: -p["score"])[:k]
 
-        ●	Step 6: Save final Reconciliation and submit through the Submission Portal:
-        ●	Save the combined document Binder as a single PDF, and submit the entire file for signature through the ProCard Reconciliation Submission portal, located at this link:https://policy.humboldt.edu/procard-reconciliation-submission.
-        ●	On that webpage, you will also find an additional guide titled “ProCard Reconciliation Submission Guide” that will instruct you on how to properly route your submission through the Adobe Submission portal. 
+def retrieve_all(query, k=NUMBER_OF_RESULTS, metrics=None):
+    # Retrieves from every KB at once; total wait is the slowest KB that answers in time, not the sum
+    pool = get_fanout_pool()
+    start = time.perf_counter()
+    futures = {}
+    timings = {}
+    for name, config in KB_OPTIONS.items():
+        # A timed-out retrieval keeps its slot until it really finishes
+        slots = kb_slots(name)
+        if not slots.acquire(blocking=False):
+            timings[name] = "busy"
+            continue
+        futures[name] = pool.submit(retrieve, config, query, k)
+        futures[name].add_done_callback(lambda _, slots=slots: slots.release())
+    results = []
+    for name, future in futures.items():
+        deadline = start + KB_OPTIONS[name].get("timeout", KB_TIMEOUT)
+        try:
+            results.append(future.result(timeout=max(0.0, deadline - time.perf_counter())))
+            timings[name] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            future.cancel()
+            timings[name] = "timed out" if isinstance(e, FutureTimeout) else BedrockError.from_exception("retrieve", e).code
+    if metrics is not None:
+        metrics["retrieval"] = timings
+    return merge_passages(results, k)
 
+def retrieve_batch(kb_id, queries, k=NUMBER_OF_RESULTS):
+    # Offline evaluation / warm-up: retrieval only, from wherever the KB's "retrieval" setting points.
+    # Hybrid KBs answer every query in one vectorized pass, the others one query at a time.
+    config = kb_config(kb_id)
+    if config.get("retrieval") not in ("local", "hybrid"):
+        return [retrieve_bedrock(kb_id, query, k) for query in queries]
+    if not config.get("local_index"):
+        raise ValueError(f"Knowledge base {kb_id} uses {config['retrieval']} retrieval but has no local_index configured")
+    if config["retrieval"] == "hybrid":
+        return get_hybrid_index(config["local_index"]).search_batch(queries, k)
+    return [retrieve_local(config, query, k) for query in queries]
 
-        </example>
-        onboarding = hire
+def generate_answer(system_text, user_text, metrics=None):
+    # Generation stays on Bedrock; the retrieved passages are in user_text with the question
+    system = [{"text": system_text}]
+    if PROMPT_CACHE_POINT:
+        system.append({"cachePoint": {"type": "default"}})
+    with telemetry.span("generate", model=MODEL_ID) as step:
+        response = bedrock_runtime.converse(
+            modelId=MODEL_ID,
+            system=system,
+            messages=[{"role": "user", "content": [{"text": user_text}]}],
+            inferenceConfig={"maxTokens": 1000},
+        )
+        usage = response.get("usage", {})
+        step.add("input_tokens", usage.get("inputTokens", 0))
+        step.add("output_tokens", usage.get("outputTokens", 0))
+    if metrics is not None:
+        metrics["prompt_tokens"] = usage.get("inputTokens", estimate_tokens(system_text) + estimate_tokens(user_text))
+        metrics["cached_tokens"] = usage.get("cacheReadInputTokens", 0)
+    return response['output']['message']['content'][0]['text']
 
-        Here is the current conversation history: 
-        $conversation_history$
+def query_knowledge_base(kb_id, query, history=(), metrics=None):
+    # history: earlier (question, answer) pairs from this session, oldest first
+    # metrics: optional dict that receives the request's prompt size in (estimated) tokens
+    # Bedrock failures raise BedrockError
+    with telemetry.span("query_knowledge_base", kb=kb_id):
+        answer_cache = get_answer_cache()
+        if not history:
+            cached = answer_cache.get(kb_id, MODEL_ID, query)
+            if cached is not None:
+                return cached
 
-        $output_format_instructions$ """)
-    try:
-        response = bedrock_agent.retrieve_and_generate(
-            input={"text": systemPrompt + query},
-            retrieveAndGenerateConfiguration={
-                "type": "KNOWLEDGE_BASE",  # ✅ REQUIRED field
-                "knowledgeBaseConfiguration": {
-                    "knowledgeBaseId": kb_id,
-                    "modelArn": "arn:aws:bedrock:us-west-2::foundation-model/anthropic.claude-3-5-sonnet-20240620-v1:0",  # ✅ correct casing
-                    "retrievalConfiguration": {
-                        "vectorSearchConfiguration": {
-                            "numberOfResults": 3
+        config = kb_config(kb_id)
+        template = get_template(kb_id)
+        history_text = format_history(list(history))
+        if metrics is not None:
+            metrics["static_tokens"] = template.prefix_tokens
+        start = time.perf_counter()
+        if config.get("retrieval") in ("local", "hybrid"):
+            system_text, user_text = template.converse_prompt(history_text, retrieve(config, query), query)
+            answer = generate_answer(system_text, user_text, metrics)
+        else:
+            prompt_template = template.retrieve_and_generate_template(history_text)
+            if metrics is not None:
+                metrics["prompt_tokens"] = estimate_tokens(prompt_template) + estimate_tokens(query)
+            with telemetry.span("retrieve_and_generate", kb=kb_id):
+                response = bedrock_agent.retrieve_and_generate(
+                    input={"text": query},
+                    retrieveAndGenerateConfiguration={
+                        "type": "KNOWLEDGE_BASE",  # ✅ REQUIRED field
+                        "knowledgeBaseConfiguration": {
+                            "knowledgeBaseId": kb_id,
+                            "modelArn": MODEL_ARN,  # ✅ correct casing
+                            "retrievalConfiguration": {
+                                "vectorSearchConfiguration": {
+                                    "numberOfResults": NUMBER_OF_RESULTS
+                                }
+                            },
+                            "generationConfiguration": {
+                                "promptTemplate": {"textPromptTemplate": prompt_template}
+                            }
                         }
                     }
-                }
-            }
-        )
-        return response.get("output", {}).get("text", "[No response text]")
-    except Exception as e:
-        return f"Error: {str(e)}"
+                )
+            answer = response.get("output", {}).get("text", "[No response text]")
+
+        if not history:
+            answer_cache.put(kb_id, MODEL_ID, query, answer, time.perf_counter() - start)
+        return answer
+
+def query_all_knowledge_bases(query, history=(), metrics=None):
+    # "Search all": fan-out retrieval across KB_OPTIONS, then a single generation call over the best passages
+    with telemetry.span("query_all_knowledge_bases", kb=SEARCH_ALL_KB_ID):
+        answer_cache = get_answer_cache()
+        if not history:
+            cached = answer_cache.get(SEARCH_ALL_KB_ID, MODEL_ID, query)
+            if cached is not None:
+                return cached
+
+        template = get_template(SEARCH_ALL_KB_ID)
+        if metrics is not None:
+            metrics["static_tokens"] = template.prefix_tokens
+        start = time.perf_counter()
+        passages = retrieve_all(query, NUMBER_OF_RESULTS + 2, metrics)
+        if not passages:
+            raise BedrockError("NoResults", "no knowledge base returned results in time", "retrieve", retryable=True)
+        system_text, user_text = template.converse_prompt(format_history(list(history)), passages, query)
+        answer = generate_answer(system_text, user_text, metrics)
+
+        if not history:
+            answer_cache.put(SEARCH_ALL_KB_ID, MODEL_ID, query, answer, time.perf_counter() - start)
+        return answer
 
 
 def main():
     st.title("🔎 Query Knowledge Base (LLM-Powered)")
 
     query = st.text_area("Enter your query:")
-    selected_kb = st.selectbox("Choose a Knowledge Base to query:", list(KB_OPTIONS.keys()))
+    selected_kb = st.selectbox("Choose a Knowledge Base to query:", [AUTO_ROUTE] + list(KB_OPTIONS.keys()) + [SEARCH_ALL])
 
     if st.button("Get Answer"):
         if query:
-            kb_id = KB_OPTIONS[selected_kb]
-            answer = query_knowledge_base(kb_id, query)
+            metrics = {}
+            if selected_kb == AUTO_ROUTE:
+                selected_kb = route_query(query, metrics) or SEARCH_ALL
+            elif selected_kb in KB_OPTIONS:
+                # Hand-picked KBs are the router's training data; logged only if HUMBLE_HELPER_QUERY_LOG is set
+                log_query(query, KB_OPTIONS[selected_kb]["route"])
+            kb_id = SEARCH_ALL_KB_ID if selected_kb == SEARCH_ALL else KB_OPTIONS[selected_kb]["kb_id"]
+            history = st.session_state.setdefault("kb_history", {}).setdefault(kb_id, [])
+            try:
+                if kb_id == SEARCH_ALL_KB_ID:
+                    answer = query_all_knowledge_bases(query, history, metrics)
+                else:
+                    answer = query_knowledge_base(kb_id, query, history, metrics)
+            except Exception as e:
+                error = BedrockError.from_exception("query_knowledge_base", e)
+                metrics["error"] = error.as_dict()
+                st.error(error.user_message())
+                st.caption(f"{error.operation}: {error.code}" + (" (throttled)" if error.throttled else ""))
+                return
+            history.append((query, answer))
             st.subheader(f"🧠 Answer from {selected_kb}")
             st.markdown(answer.replace("\n", "  \n"))  # preserves newlines
+            if "route" in metrics:
+                st.caption(f"Routed with confidence {metrics['route']['confidence']:.2f} "
+                           f"in {metrics['route']['ms']:.2f} ms")
+            if "prompt_tokens" in metrics:
+                st.caption(f"Prompt ≈ {metrics['prompt_tokens']} input tokens, "
+                           f"{metrics['static_tokens']} of them in the cacheable prefix")
+            if "retrieval" in metrics:
+                st.caption("Retrieval: " + ", ".join(f"{name} {t}" if isinstance(t, str) else f"{name} {t:.2f}s"
+                                                     for name, t in metrics["retrieval"].items()))
+            st.caption(get_answer_cache().report())
+            st.caption(METRICS.report())
         else:
             st.warning("Please enter a query!")
 
@@ -0,0 +1,156 @@
+import argparse
+import json
+import math
+import os
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from local_index import TOKEN_PATTERN, LocalIndex
+
+#Keyword + vector retrieval over a local_index.py index directory.
+#BM25 catches exact lookups (form numbers, committee names, dates) that embeddings blur together,
+#the vector side catches paraphrases, and reciprocal rank fusion merges the two rankings.
+#The BM25 inverted index is stored next to the vectors as bm25.npz + bm25_terms.json.
+
+K1 = 1.2
+B = 0.75
+RRF_K = 60
+FUSION_DEPTH = 50
+BATCH_BLOCK = 256
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+class BM25Index:
+    def __init__(self, terms, offsets, docs, scores, doc_count):
+        #Postings for term t are docs[offsets[t]:offsets[t+1]], with their BM25 weight precomputed in scores
+        self.terms = terms
+        self.offsets = offsets
+        self.docs = docs
+        self.scores = scores
+        self.doc_count = doc_count
+
+    @classmethod
+    def build(cls, texts, k1=K1, b=B):
+        postings = defaultdict(list)
+        doc_lengths = []
+        for doc, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings[term].append((doc, tf))
+
+        doc_count = len(doc_lengths)
+        lengths = np.asarray(doc_lengths, dtype=np.float32)
+        norm = k1 * (1 - b + b * lengths / max(float(lengths.mean()) if doc_count else 1.0, 1e-9))
+        terms = {}
+        offsets = [0]
+        docs = []
+        tfs = []
+        idfs = []
+        for term, plist in postings.items():
+            terms[term] = len(terms)
+            docs.extend(d for d, _ in plist)
+            tfs.extend(tf for _, tf in plist)
+            df = len(plist)
+            idfs.extend([math.log(1 + (doc_count - df + 0.5) / (df + 0.5))] * df)
+            offsets.append(len(docs))
+        docs = np.asarray(docs, dtype=np.int32)
+        tfs = np.asarray(tfs, dtype=np.float32)
+        scores = np.asarray(idfs, dtype=np.float32) * tfs * (k1 + 1) / (tfs + norm[docs])
+        return cls(terms, np.asarray(offsets, dtype=np.int64), docs, scores.astype(np.float32), doc_count)
+
+    def save(self, index_dir):
+        np.savez(os.path.join(index_dir, "bm25.npz"), offsets=self.offsets, docs=self.docs,
+                 scores=self.scores, doc_count=np.asarray(self.doc_count))
+        with open(os.path.join(index_dir, "bm25_terms.json"), "w", encoding="utf-8") as f:
+            json.dump(self.terms, f)
+
+    @classmethod
+    def load(cls, index_dir):
+        data = np.load(os.path.join(index_dir, "bm25.npz"))
+        with open(os.path.join(index_dir, "bm25_terms.json"), "r", encoding="utf-8") as f:
+            terms = json.load(f)
+        return cls(terms, data["offsets"], data["docs"], data["scores"], int(data["doc_count"]))
+
+    def add_scores(self, row, query):
+        #Adds this query's BM25 scores into `row` (a length doc_count array)
+        for term, count in Counter(tokenize(query)).items():
+            t = self.terms.get(term)
+            if t is not None:
+                start, end = self.offsets[t], self.offsets[t + 1]
+                row[self.docs[start:end]] += count * self.scores[start:end]
+
+    def score(self, query):
+        row = np.zeros(self.doc_count, dtype=np.float32)
+        self.add_scores(row, query)
+        return row
+
+def ranked(scores, depth):
+    #Row ids of the `depth` best positive scores, best first
+    depth = min(depth, len(scores))
+    if depth == 0:
+        return []
+    best = np.argpartition(-scores, depth - 1)[:depth]
+    best = best[np.argsort(-scores[best])]
+    return [int(i) for i in best if scores[i] > 0]
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, row in enumerate(ranking):
+            fused[row] += 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: -item[1])
+
+class HybridIndex:
+    def __init__(self, index_dir):
+        self.vector_index = LocalIndex(index_dir)
+        if os.path.exists(os.path.join(index_dir, "bm25.npz")):
+            self.bm25 = BM25Index.load(index_dir)
+        else:
+            self.bm25 = BM25Index.build(chunk["text"] for chunk in self.vector_index.chunks)
+            self.bm25.save(index_dir)
+
+    def hits(self, fused, k):
+        return [dict(self.vector_index.chunks[row], score=score) for row, score in fused[:k]]
+
+    def search(self, query, k=3, depth=FUSION_DEPTH):
+        query_vector = self.vector_index.embedder.embed([query])[0]
+        vector_ranking = ranked(np.asarray(self.vector_index.vectors @ query_vector), depth)
+        keyword_ranking = ranked(self.bm25.score(query), depth)
+        return self.hits(reciprocal_rank_fusion([keyword_ranking, vector_ranking]), k)
+
+    def search_batch(self, queries, k=3, depth=FUSION_DEPTH, block=BATCH_BLOCK):
+        #Many queries at once: one embedding call and one matrix product per block of queries
+        results = []
+        vectors = self.vector_index.vectors
+        for start in range(0, len(queries), block):
+            chunk = queries[start:start + block]
+            vector_scores = np.asarray(self.vector_index.embedder.embed(chunk) @ vectors.T)
+            keyword_scores = np.zeros((len(chunk), self.bm25.doc_count), dtype=np.float32)
+            for row, query in zip(keyword_scores, chunk):
+                self.bm25.add_scores(row, query)
+            for v_row, k_row in zip(vector_scores, keyword_scores):
+                fused = reciprocal_rank_fusion([ranked(k_row, depth), ranked(v_row, depth)])
+                results.append(self.hits(fused, k))
+        return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hybrid BM25 + vector search over a local index.")
+    parser.add_argument("index_dir")
+    parser.add_argument("queries", nargs="*", help="queries to run, more can be read from --file")
+    parser.add_argument("--file", help="file with one query per line, answered in one batch")
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    queries = list(args.queries)
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            queries += [line.strip() for line in f if line.strip()]
+
+    index = HybridIndex(args.index_dir)
+    for query, hits in zip(queries, index.search_batch(queries, args.k)):
+        print(f"> {query}")
+        for hit in hits:
+            print(f"  {hit['score']:.4f}  {hit['url']}  {hit['text'][:120]}")
@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import re
+
+import numpy as np
+
+from local_index import HashingEmbedder
+from query_log import QUERY_LOG_PATH, query_log_path, read_query_log
+
+#Picks the knowledge base for a query locally, without an extra model call.
+#  keyword rules  - hand-written patterns that add a fixed boost to a route's score
+#  linear model   - softmax regression over hashed word features, trained on query logs
+#route() returns (route, confidence); a confidence under the threshold returns route None,
+#which callers treat as "search all knowledge bases".
+#Query logs (see query_log.py) are written by george_rag.py when HUMBLE_HELPER_QUERY_LOG names a file;
+#without a saved model the router trains on that file, and `python kb_router.py train` refits from it.
+
+MODEL_PATH = "kb_router.npz"
+ROUTES = ("general", "meetings", "peoplesoft")
+CONFIDENCE_THRESHOLD = 0.6
+RULE_BOOST = 2.0
+
+KEYWORD_RULES = {
+    "meetings": r"\b(meeting|minutes|agenda|senate|committee|council|quorum|motion|approved at)\b",
+    "peoplesoft": r"\b(peoplesoft|procard|pro card|chartfield|cfs|myhumboldt|reconcil\w*|requisition|voucher|timesheet|business unit)\b",
+    "general": r"\b(admission|apply|campus|tuition|parking|library|housing|financial aid|deadline|office hours)\b",
+}
+
+#Starting point until real query logs exist; every line in a log is added on top of these
+SEED_QUERIES = [
+    ("How do I apply to Cal Poly Humboldt?", "general"),
+    ("Where is the library and when is it open?", "general"),
+    ("What are the tuition and fees for graduate students?", "general"),
+    ("How do I get a parking permit on campus?", "general"),
+    ("Who do I contact about financial aid?", "general"),
+    ("What research funding opportunities are available?", "general"),
+    ("Where can I find the sponsored programs office?", "general"),
+    ("How do I submit a grant proposal?", "general"),
+    ("What housing options are there for new students?", "general"),
+    ("When is the deadline to register for classes?", "general"),
+    ("What did the senate decide about the budget last month?", "meetings"),
+    ("Show me the agenda for the next committee meeting", "meetings"),
+    ("Minutes from the October faculty senate meeting", "meetings"),
+    ("Which motions were approved at the council meeting?", "meetings"),
+    ("Who attended the curriculum committee last week?", "meetings"),
+    ("When was the strategic plan discussed by the senate?", "meetings"),
+    ("What was voted on at the last board meeting?", "meetings"),
+    ("Summarize the discussion on enrollment from the meeting notes", "meetings"),
+    ("How do I reconcile my ProCard statement?", "peoplesoft"),
+    ("How do I change the chartfield on a transaction?", "peoplesoft"),
+    ("Where do I find ProCard Adjustment in PeopleSoft Finance?", "peoplesoft"),
+    ("How do I create a requisition in CFS?", "peoplesoft"),
+    ("How do I approve a voucher in PeopleSoft?", "peoplesoft"),
+    ("What business unit should I select for my reconciliation?", "peoplesoft"),
+    ("How do I run a process monitor report?", "peoplesoft"),
+    ("How do I enter my timesheet in myHumboldt?", "peoplesoft"),
+    ("How do I onboard a new hire in PeopleSoft?", "peoplesoft"),
+    ("Where do I submit the reconciliation binder for signature?", "peoplesoft"),
+]
+
+class KBRouter:
+    def __init__(self, routes=ROUTES, rules=KEYWORD_RULES, threshold=CONFIDENCE_THRESHOLD, dim=1024):
+        self.routes = list(routes)
+        self.threshold = threshold
+        self.embedder = HashingEmbedder(dim)
+        self.rules = [(self.routes.index(route), re.compile(pattern, re.IGNORECASE)) for route, pattern in rules.items()]
+        self.weights = np.zeros((dim, len(self.routes)), dtype=np.float32)
+        self.bias = np.zeros(len(self.routes), dtype=np.float32)
+
+    def fit(self, examples, epochs=300, lr=1.0, l2=1e-2):
+        #Full-batch gradient descent on the softmax cross-entropy; a few hundred queries train in well under a second
+        queries = [query for query, route in examples if route in self.routes]
+        labels = np.array([self.routes.index(route) for query, route in examples if route in self.routes])
+        x = self.embedder.embed(queries)
+        y = np.eye(len(self.routes), dtype=np.float32)[labels]
+        w = np.zeros_like(self.weights)
+        b = np.zeros_like(self.bias)
+        for _ in range(epochs):
+            p = softmax(x @ w + b)
+            grad = (p - y) / len(x)
+            w -= lr * (x.T @ grad + l2 * w)
+            b -= lr * grad.sum(axis=0)
+        self.weights, self.bias = w, b
+        return self
+
+    def scores(self, query):
+        logits = self.embedder.embed([query])[0] @ self.weights + self.bias
+        for index, pattern in self.rules:
+            if pattern.search(query):
+                logits[index] += RULE_BOOST
+        return softmax(logits)
+
+    def route(self, query):
+        #(route, confidence); route is None when the best route is below the threshold
+        probs = self.scores(query)
+        best = int(np.argmax(probs))
+        confidence = float(probs[best])
+        return (self.routes[best] if confidence >= self.threshold else None), confidence
+
+    def save(self, path=MODEL_PATH):
+        np.savez(path, weights=self.weights, bias=self.bias, routes=np.array(self.routes))
+
+    @classmethod
+    def load(cls, path=MODEL_PATH, **kwargs):
+        data = np.load(path)
+        router = cls(routes=[str(r) for r in data["routes"]], dim=data["weights"].shape[0], **kwargs)
+        router.weights, router.bias = data["weights"], data["bias"]
+        return router
+
+def softmax(logits):
+    z = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return z / z.sum(axis=-1, keepdims=True)
+
+def default_router(path=MODEL_PATH):
+    #Saved model if there is one, otherwise trained on the seed queries plus whatever the log holds
+    if os.path.exists(path):
+        return KBRouter.load(path)
+    return KBRouter().fit(SEED_QUERIES + read_query_log())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train or try the local knowledge base router.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train = sub.add_parser("train", help="fit on the seed queries plus query logs and save the model")
+    train.add_argument("logs", nargs="*", default=[query_log_path() or QUERY_LOG_PATH])
+    train.add_argument("--model", default=MODEL_PATH)
+    route = sub.add_parser("route", help="route a query with the saved (or seed) model")
+    route.add_argument("query")
+    route.add_argument("--model", default=MODEL_PATH)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        examples = list(SEED_QUERIES)
+        for path in args.logs:
+            examples += read_query_log(path)
+        KBRouter().fit(examples).save(args.model)
+        print(f"Trained on {len(examples)} queries, saved to {args.model}")
+    else:
+        name, confidence = default_router(args.model).route(args.query)
+        print(f"{name or 'all knowledge bases'} (confidence {confidence:.2f})")
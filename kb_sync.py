@@ -0,0 +1,251 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+# page_stream.py lives with the scrapers, which import it as a top-level module
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "webScraping"))
+from page_stream import read_pages
+
+#Delta sync from local corpora into the S3 data sources behind the Bedrock knowledge bases.
+#Config (kb_sync.json):
+#  {"bucket": "humble-helper-kb",
+#   "knowledge_bases": {"QTYWCMLKR0": {"data_source_id": "...", "prefix": "general",
+#                                      "sources": ["humboldt_body_links_text.dedup.jsonl", "linkTextFile/*.txt"]}}}
+#Sources are page JSONL files (one document per record, url + text + any extra metadata) or plain
+#text files (one document per file). Every document becomes <prefix>/<id>.txt plus the
+#<id>.txt.metadata.json sidecar Bedrock reads for citations; <id> is derived from the URL, so an
+#edited page overwrites its own object.
+#  - only documents whose content hash differs from the last sync are uploaded, documents that
+#    disappeared from the sources are deleted, so sources have to be full snapshots: scrape.py merges
+#    every crawl into its output and only drops pages that answered 404/410 or are no longer linked
+#  - uploads go out in size-bounded batches on a thread pool; the state file is saved after every
+#    batch, so an interrupted sync resumes where it stopped instead of starting over
+#  - knowledge bases with changes get an ingestion job, jobs for different KBs run concurrently
+#    (bounded by --jobs) and their cached answers are invalidated once the job completes
+#Point --endpoint-url at any S3-compatible store (MinIO, `moto_server`) to try it without AWS.
+
+CONFIG_PATH = "kb_sync.json"
+STATE_PATH = "kb_sync_state.json"
+BATCH_BYTES = 8 * 1024 * 1024
+BATCH_DOCS = 500
+DELETE_BATCH = 1000
+POLL_SECONDS = 10
+
+def doc_id(url, occurrence):
+    #Stable per URL; a source with several records per URL (PDF chunks) numbers them in order
+    return hashlib.sha1(f"{url}#{occurrence}".encode()).hexdigest()
+
+def iter_documents(sources):
+    #(id, url, text, metadata) for every document in the configured sources, streamed
+    seen = {}
+    for pattern in sources:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            if path.endswith(".jsonl"):
+                records = read_pages(path)
+            else:
+                with open(path, encoding="utf-8") as f:
+                    records = [{"url": path.replace(os.sep, "/"), "text": f.read()}]
+            for record in records:
+                text = record.get("text", "")
+                if not text.strip():
+                    continue
+                url = record.get("url") or path
+                n = seen[url] = seen.get(url, -1) + 1
+                metadata = {k: v for k, v in record.items() if k not in ("text", "fetched_at", "fetch_seconds") and v not in (None, "")}
+                yield doc_id(url, n), url, text, metadata
+
+def encode_document(text, metadata):
+    body = text.encode("utf-8")
+    sidecar = json.dumps({"metadataAttributes": metadata}, sort_keys=True).encode("utf-8")
+    digest = hashlib.sha256(body + b"\x00" + sidecar).hexdigest()
+    return body, sidecar, digest
+
+class SyncState:
+    #{kb_id: {doc id: sha256}} as of the last successful upload, saved atomically
+    def __init__(self, path=STATE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def hashes(self, kb_id):
+        return dict(self.entries.get(kb_id, {}))
+
+    def update(self, kb_id, uploaded=(), deleted=()):
+        with self.lock:
+            docs = self.entries.setdefault(kb_id, {})
+            docs.update(uploaded)
+            for key in deleted:
+                docs.pop(key, None)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+class SyncStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {"scanned": 0, "unchanged": 0, "uploaded": 0, "deleted": 0, "bytes": 0, "batches": 0}
+        self.start = time.perf_counter()
+
+    def add(self, **counts):
+        with self.lock:
+            for key, value in counts.items():
+                self.values[key] += value
+
+    def report(self):
+        seconds = time.perf_counter() - self.start
+        v = self.values
+        return (f"{v['scanned']} documents scanned, {v['unchanged']} unchanged, {v['uploaded']} uploaded in "
+                f"{v['batches']} batches, {v['deleted']} deleted | {v['bytes'] / 1e6:.2f} MB in {seconds:.1f}s: "
+                f"{v['uploaded'] / seconds:.1f} docs/s, {v['bytes'] / 1e6 / seconds:.2f} MB/s")
+
+def upload_batch(s3, bucket, prefix, batch):
+    #One PUT per document and one per sidecar; returns {doc id: sha256} for the state file
+    uploaded = {}
+    for key, body, sidecar, digest in batch:
+        s3.put_object(Bucket=bucket, Key=f"{prefix}/{key}.txt", Body=body, ContentType="text/plain; charset=utf-8")
+        s3.put_object(Bucket=bucket, Key=f"{prefix}/{key}.txt.metadata.json", Body=sidecar, ContentType="application/json")
+        uploaded[key] = digest
+    return uploaded
+
+def delete_documents(s3, bucket, prefix, keys):
+    objects = [{"Key": f"{prefix}/{key}{suffix}"} for key in keys for suffix in (".txt", ".txt.metadata.json")]
+    for i in range(0, len(objects), DELETE_BATCH):
+        s3.delete_objects(Bucket=bucket, Delete={"Objects": objects[i:i + DELETE_BATCH], "Quiet": True})
+
+def sync_knowledge_base(s3, bucket, kb_id, config, state, stats, pool, max_pending=16, batch_bytes=BATCH_BYTES, batch_docs=BATCH_DOCS):
+    #Uploads what changed for one KB, returns the number of documents added, changed or deleted.
+    #At most `max_pending` batches are queued, so memory stays bounded however large the corpus is.
+    prefix = config.get("prefix", kb_id).strip("/")
+    previous = state.hashes(kb_id)
+    current = set()
+    futures = []
+    batch, size = [], 0
+
+    def record(future):
+        if future.exception() is None:
+            state.update(kb_id, uploaded=future.result())
+
+    def submit():
+        nonlocal batch, size
+        pending = [f for f in futures if not f.done()]
+        if len(pending) >= max_pending:
+            wait(pending, return_when=FIRST_COMPLETED)
+        stats.add(batches=1, uploaded=len(batch), bytes=size)
+        future = pool.submit(upload_batch, s3, bucket, prefix, batch)
+        future.add_done_callback(record)
+        futures.append(future)
+        batch, size = [], 0
+
+    for key, url, text, metadata in iter_documents(config["sources"]):
+        current.add(key)
+        body, sidecar, digest = encode_document(text, metadata)
+        stats.add(scanned=1)
+        if previous.get(key) == digest:
+            stats.add(unchanged=1)
+            continue
+        batch.append((key, body, sidecar, digest))
+        size += len(body) + len(sidecar)
+        if size >= batch_bytes or len(batch) >= batch_docs:
+            submit()
+    if batch:
+        submit()
+
+    for future in as_completed(futures):
+        future.result()
+    deleted = sorted(set(previous) - current)
+    if deleted:
+        delete_documents(s3, bucket, prefix, deleted)
+        state.update(kb_id, deleted=deleted)
+        stats.add(deleted=len(deleted))
+    return sum(len(f.result()) for f in futures) + len(deleted)
+
+def run_ingestion_job(agent, kb_id, data_source_id, poll_seconds=POLL_SECONDS):
+    #Starts a job for the KB's S3 data source and waits for it; Bedrock allows one running job per
+    #data source, so a ConflictException means an earlier job is still going and we wait our turn
+    while True:
+        try:
+            job = agent.start_ingestion_job(knowledgeBaseId=kb_id, dataSourceId=data_source_id)["ingestionJob"]
+            break
+        except Exception as e:
+            if getattr(e, "code", None) != "ConflictException":
+                raise
+            time.sleep(poll_seconds)
+    while job["status"] in ("STARTING", "IN_PROGRESS", "STOPPING"):
+        time.sleep(poll_seconds)
+        job = agent.get_ingestion_job(knowledgeBaseId=kb_id, dataSourceId=data_source_id,
+                                      ingestionJobId=job["ingestionJobId"])["ingestionJob"]
+    return job
+
+def sync_all(config, s3, agent=None, state=None, workers=8, jobs=2, poll_seconds=POLL_SECONDS, on_ingested=None):
+    #Uploads every KB's changes, then ingests the changed KBs, at most `jobs` at a time.
+    #Returns ({kb_id: ingestion job or None}, SyncStats)
+    state = state or SyncState()
+    stats = SyncStats()
+    changed = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for kb_id, kb in config["knowledge_bases"].items():
+            changed[kb_id] = sync_knowledge_base(s3, config["bucket"], kb_id, kb, state, stats, pool, workers * 2)
+            print(f"{kb_id}: {changed[kb_id]} documents added, changed or deleted")
+
+    results = {kb_id: None for kb_id in changed}
+    pending = [kb_id for kb_id, n in changed.items() if n and config["knowledge_bases"][kb_id].get("data_source_id")]
+    if agent is None or not pending:
+        return results, stats
+    with ThreadPoolExecutor(max_workers=jobs) as job_pool:
+        futures = {job_pool.submit(run_ingestion_job, agent, kb_id, config["knowledge_bases"][kb_id]["data_source_id"], poll_seconds): kb_id
+                   for kb_id in pending}
+        for future in as_completed(futures):
+            kb_id = futures[future]
+            try:
+                results[kb_id] = job = future.result()
+            except Exception as e:
+                print(f"[ERROR] Ingestion for {kb_id} failed to run: {e}")
+                continue
+            print(f"{kb_id}: ingestion job {job['ingestionJobId']} {job['status']} {job.get('statistics', {})}")
+            if job["status"] == "COMPLETE" and on_ingested:
+                on_ingested(kb_id)
+    return results, stats
+
+def invalidate_answers(kb_id):
+    #Answers cached from the old documents; "ALL" (search across KBs) may have used them too
+    from answer_cache import AnswerCache
+    cache = AnswerCache(embedder=None)
+    removed = cache.invalidate(kb_id) + cache.invalidate("ALL")
+    print(f"{kb_id}: {removed} cached answers invalidated")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delta-sync local corpora into the knowledge bases' S3 data sources.")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--state", default=STATE_PATH, help="content hashes from the last sync")
+    parser.add_argument("--kb", nargs="*", help="only these knowledge base ids (default: all in the config)")
+    parser.add_argument("--endpoint-url", help="S3-compatible endpoint, e.g. http://localhost:5000 for moto_server")
+    parser.add_argument("--workers", type=int, default=8, help="batches uploaded at once")
+    parser.add_argument("--jobs", type=int, default=2, help="ingestion jobs run at once")
+    parser.add_argument("--no-ingest", action="store_true", help="upload only, do not start ingestion jobs")
+    args = parser.parse_args()
+
+    import boto3
+    from botocore.config import Config
+    with open(args.config, encoding="utf-8") as f:
+        config = json.load(f)
+    if args.kb:
+        config["knowledge_bases"] = {k: v for k, v in config["knowledge_bases"].items() if k in args.kb}
+
+    s3 = boto3.client("s3", endpoint_url=args.endpoint_url,
+                      config=Config(max_pool_connections=args.workers * 2, retries={"mode": "adaptive"}))
+    agent = None
+    if not args.no_ingest:
+        from bedrock_client import get_client
+        agent = get_client("bedrock-agent")
+    _, stats = sync_all(config, s3, agent, SyncState(args.state), args.workers, args.jobs, on_ingested=invalidate_answers)
+    print(stats.report())
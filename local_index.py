@@ -0,0 +1,214 @@
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import zlib
+from collections import Counter
+
+import numpy as np
+
+# page_stream.py lives with the scrapers, which import it as a top-level module
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "webScraping"))
+from page_stream import read_pages
+
+#Offline retrieval over the cleaned scrape (JSONL from page_dedup.py / scrape.py).
+#An index is a directory:
+#  meta.json     - embedder name, dimension, chunk count
+#  vectors.f32   - float32 matrix (chunks x dim), opened with np.memmap so it is never fully loaded
+#  chunks.jsonl  - {"url", "text"} per row of the matrix
+#  ivf.npz       - optional inverted-file (k-means) index for approximate search on big corpora
+
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 40
+EMBED_BATCH = 256
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def chunk_text(text, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    #Overlapping windows of words so an answer split across a boundary still lands in one chunk
+    words = text.split()
+    if len(words) <= chunk_words:
+        return [" ".join(words)] if words else []
+    step = chunk_words - overlap
+    return [" ".join(words[i:i + chunk_words]) for i in range(0, len(words) - overlap, step)]
+
+class HashingEmbedder:
+    #Fully local embedding: hashed unigram+bigram features with sublinear tf, L2 normalised
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed_one(self, text, out):
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        features = Counter(tokens)
+        features.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        for feature, count in features.items():
+            h = zlib.crc32(feature.encode())
+            out[h % self.dim] += (1.0 + math.log(count)) * (1.0 if h & 0x80000000 else -1.0)
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in zip(vectors, texts):
+            self.embed_one(text, row)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+class BedrockEmbedder:
+    #Titan text embeddings, used when the index should share an embedding space with Bedrock
+    def __init__(self, model_id="amazon.titan-embed-text-v2:0", dim=512, client=None):
+        self.model_id = model_id
+        self.dim = dim
+        self.name = f"bedrock:{model_id}:{dim}"
+        self.client = client
+
+    def embed(self, texts):
+        if self.client is None:
+            from bedrock_client import get_client
+            self.client = get_client("bedrock-runtime")
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            response = self.client.invoke_model(
+                modelId=self.model_id,
+                body=json.dumps({"inputText": text, "dimensions": self.dim, "normalize": True}),
+            )
+            vectors[i] = json.loads(response["body"].read())["embedding"]
+        return vectors
+
+def make_embedder(name):
+    #Inverse of embedder.name, so an index can always rebuild the embedder it was made with
+    if name.startswith("hashing-"):
+        return HashingEmbedder(int(name.split("-", 1)[1]))
+    if name.startswith("bedrock:"):
+        model_id, dim = name.split(":", 1)[1].rsplit(":", 1)
+        return BedrockEmbedder(model_id, int(dim))
+    raise ValueError(f"Unknown embedder {name!r}")
+
+def build_index(records, index_dir, embedder=None, ivf=False):
+    #Streams page records into an index directory, embedding chunks in batches
+    embedder = embedder or HashingEmbedder()
+    os.makedirs(index_dir, exist_ok=True)
+    for derived in ("ivf.npz", "bm25.npz", "bm25_terms.json"):
+        if os.path.exists(os.path.join(index_dir, derived)):
+            os.remove(os.path.join(index_dir, derived))
+    count = 0
+    batch = []
+
+    def flush(vectors_file, chunks_file):
+        vectors_file.write(embedder.embed([text for _, text in batch]).astype(np.float32).tobytes())
+        for url, text in batch:
+            chunks_file.write(json.dumps({"url": url, "text": text}, ensure_ascii=False) + "\n")
+        batch.clear()
+
+    with open(os.path.join(index_dir, "vectors.f32"), "wb") as vectors_file, \
+            open(os.path.join(index_dir, "chunks.jsonl"), "w", encoding="utf-8") as chunks_file:
+        for record in records:
+            for chunk in chunk_text(record["text"]):
+                batch.append((record["url"], chunk))
+                count += 1
+                if len(batch) >= EMBED_BATCH:
+                    flush(vectors_file, chunks_file)
+        if batch:
+            flush(vectors_file, chunks_file)
+
+    with open(os.path.join(index_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"embedder": embedder.name, "dim": embedder.dim, "count": count}, f)
+
+    index = LocalIndex(index_dir)
+    if ivf:
+        index.build_ivf()
+    return index
+
+class LocalIndex:
+    def __init__(self, index_dir, embedder=None):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.embedder = embedder or make_embedder(self.meta["embedder"])
+        count, dim = self.meta["count"], self.meta["dim"]
+        if count:
+            self.vectors = np.memmap(os.path.join(index_dir, "vectors.f32"), dtype=np.float32, mode="r", shape=(count, dim))
+        else:
+            self.vectors = np.zeros((0, dim), dtype=np.float32)
+        with open(os.path.join(index_dir, "chunks.jsonl"), "r", encoding="utf-8") as f:
+            self.chunks = [json.loads(line) for line in f]
+        self.ivf = None
+        ivf_path = os.path.join(index_dir, "ivf.npz")
+        if os.path.exists(ivf_path):
+            self.ivf = dict(np.load(ivf_path))
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def build_ivf(self, n_lists=None, iterations=10, sample=20000, seed=0):
+        #Spherical k-means over (a sample of) the vectors, then every chunk goes to its nearest list
+        count = len(self)
+        if count == 0:
+            return
+        n_lists = n_lists or max(1, int(math.sqrt(count)))
+        rng = np.random.default_rng(seed)
+        train = np.asarray(self.vectors[np.sort(rng.choice(count, min(sample, count), replace=False))])
+        centroids = train[rng.choice(len(train), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(train @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = train[labels == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[c] = centroid / max(np.linalg.norm(centroid), 1e-12)
+
+        labels = np.concatenate([np.argmax(self.vectors[i:i + 65536] @ centroids.T, axis=1)
+                                 for i in range(0, count, 65536)])
+        order = np.argsort(labels, kind="stable")
+        offsets = np.searchsorted(labels[order], np.arange(n_lists + 1))
+        self.ivf = {"centroids": centroids, "order": order, "offsets": offsets}
+        np.savez(os.path.join(self.index_dir, "ivf.npz"), **self.ivf)
+
+    def top_k(self, scores, k, ids=None):
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        if ids is not None:
+            return [(int(ids[i]), float(scores[i])) for i in best]
+        return [(int(i), float(scores[i])) for i in best]
+
+    def search_vector(self, query_vector, k=3, approximate=False, nprobe=8):
+        #Returns [(row, score)] best first; approximate=True only scans the nprobe closest IVF lists
+        if approximate and self.ivf is not None:
+            lists = np.argsort(-(self.ivf["centroids"] @ query_vector))[:nprobe]
+            offsets, order = self.ivf["offsets"], self.ivf["order"]
+            ids = np.concatenate([order[offsets[l]:offsets[l + 1]] for l in lists])
+            ids.sort()
+            return self.top_k(self.vectors[ids] @ query_vector, k, ids)
+        return self.top_k(self.vectors @ query_vector, k)
+
+    def search(self, query, k=3, approximate=False, nprobe=8):
+        #Returns [{"url", "text", "score"}] for the k best chunks
+        query_vector = self.embedder.embed([query])[0]
+        return [dict(self.chunks[row], score=score)
+                for row, score in self.search_vector(query_vector, k, approximate, nprobe)]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query a local vector index over scraped pages.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build")
+    build.add_argument("input", help="page JSONL, e.g. humboldt_body_links_text.dedup.jsonl")
+    build.add_argument("index_dir")
+    build.add_argument("--ivf", action="store_true", help="also build the approximate IVF index")
+    build.add_argument("--bedrock", action="store_true", help="embed with Titan instead of the local hashing embedder")
+    search = commands.add_parser("search")
+    search.add_argument("index_dir")
+    search.add_argument("query")
+    search.add_argument("-k", type=int, default=3)
+    search.add_argument("--approximate", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        embedder = BedrockEmbedder() if args.bedrock else HashingEmbedder()
+        index = build_index(read_pages(args.input), args.index_dir, embedder, ivf=args.ivf)
+        print(f"Indexed {len(index)} chunks into '{args.index_dir}'")
+    else:
+        for hit in LocalIndex(args.index_dir).search(args.query, args.k, args.approximate):
+            print(f"{hit['score']:.3f}  {hit['url']}\n       {hit['text'][:200]}")
@@ -0,0 +1,139 @@
+import argparse
+import os
+import random
+import sys
+from collections import Counter
+
+# page_stream.py lives with the scrapers, which import it as a top-level module
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "webScraping"))
+from page_stream import read_pages, write_pages
+
+#Cleaning stage for scraped pages (JSONL from webScraping/scrape.py), run before indexing.
+#  1. Boilerplate: every page is cut into k-word shingles and we count how many pages each shingle
+#     shows up on. Shingles found on a large share of pages (header, footer, navigation) are cut out.
+#  2. Near duplicates: the remaining text gets a MinHash signature, LSH banding finds candidate pages
+#     and any page whose estimated Jaccard similarity to an earlier kept page passes the threshold is dropped.
+#Both passes stream the file, so time and memory grow linearly with the corpus.
+
+SHINGLE_WORDS = 8
+NUM_HASHES = 64
+BANDS = 16
+MASK64 = (1 << 64) - 1
+
+def shingle_hashes(words, k=SHINGLE_WORDS):
+    if len(words) < k:
+        return [hash(" ".join(words)) & MASK64] if words else []
+    return [hash(" ".join(words[i:i + k])) & MASK64 for i in range(len(words) - k + 1)]
+
+def count_shingles(records, k=SHINGLE_WORDS):
+    #Pass 1: number of pages each shingle appears on
+    counts = Counter()
+    pages = 0
+    for record in records:
+        counts.update(set(shingle_hashes(record["text"].split(), k)))
+        pages += 1
+    return counts, pages
+
+def strip_boilerplate(words, boilerplate, k=SHINGLE_WORDS):
+    #Drops every word covered by a boilerplate shingle
+    if len(words) < k:
+        return words
+    covered = bytearray(len(words))
+    for i, h in enumerate(shingle_hashes(words, k)):
+        if h in boilerplate:
+            covered[i:i + k] = b"\x01" * k
+    return [word for word, skip in zip(words, covered) if not skip]
+
+class MinHashLSH:
+    #XOR-permuted MinHash: each "permutation" is a random 64-bit mask over already well-mixed hashes
+    def __init__(self, num_hashes=NUM_HASHES, bands=BANDS, threshold=0.85, seed=1):
+        rng = random.Random(seed)
+        self.masks = [rng.getrandbits(64) for _ in range(num_hashes)]
+        self.bands = bands
+        self.rows = num_hashes // bands
+        self.threshold = threshold
+        self.buckets = [{} for _ in range(bands)]
+        self.signatures = []
+
+    def signature(self, hashes):
+        return [min(h ^ mask for h in hashes) for mask in self.masks]
+
+    def similarity(self, a, b):
+        return sum(x == y for x, y in zip(a, b)) / len(a)
+
+    def add_if_new(self, hashes):
+        #Returns the index of a near-duplicate already in the index, or None after adding this one
+        if not hashes:
+            return None
+        sig = self.signature(hashes)
+        keys = [tuple(sig[b * self.rows:(b + 1) * self.rows]) for b in range(self.bands)]
+        candidates = set()
+        for bucket, key in zip(self.buckets, keys):
+            candidates.update(bucket.get(key, ()))
+        for index in sorted(candidates):
+            if self.similarity(sig, self.signatures[index]) >= self.threshold:
+                return index
+        index = len(self.signatures)
+        self.signatures.append(sig)
+        for bucket, key in zip(self.buckets, keys):
+            bucket.setdefault(key, []).append(index)
+        return None
+
+def dedup_pages(records, shingle_counts, page_count, boilerplate_share=0.3, min_pages=3, threshold=0.85, stats=None):
+    #Pass 2: yields cleaned records, skipping near duplicates and pages that were only boilerplate
+    cutoff = max(min_pages, boilerplate_share * page_count)
+    boilerplate = {h for h, n in shingle_counts.items() if n >= cutoff}
+    lsh = MinHashLSH(threshold=threshold)
+    stats = stats if stats is not None else {}
+    for key in ("pages_in", "pages_out", "duplicates", "empty", "chars_in", "chars_out", "boilerplate_chars", "duplicate_chars"):
+        stats.setdefault(key, 0)
+
+    for record in records:
+        text = record["text"]
+        stats["pages_in"] += 1
+        stats["chars_in"] += len(text)
+        words = strip_boilerplate(text.split(), boilerplate)
+        cleaned = " ".join(words)
+        stats["boilerplate_chars"] += len(text) - len(cleaned)
+        if not cleaned:
+            stats["empty"] += 1
+            continue
+        if lsh.add_if_new(set(shingle_hashes(words))) is not None:
+            stats["duplicates"] += 1
+            stats["duplicate_chars"] += len(cleaned)
+            continue
+        stats["pages_out"] += 1
+        stats["chars_out"] += len(cleaned)
+        yield dict(record, text=cleaned)
+
+def dedup_file(input_path, output_path, **options):
+    #Reads input_path twice (count, then clean) and streams the result to output_path
+    shingle_counts, page_count = count_shingles(read_pages(input_path))
+    stats = {}
+    write_pages(dedup_pages(read_pages(input_path), shingle_counts, page_count, stats=stats, **options), output_path)
+    return stats
+
+def report(stats):
+    removed = stats["chars_in"] - stats["chars_out"]
+    share = removed / stats["chars_in"] if stats["chars_in"] else 0.0
+    return (f"{stats['pages_in']} pages in, {stats['pages_out']} out "
+            f"({stats['duplicates']} near duplicates, {stats['empty']} boilerplate-only)\n"
+            f"{removed:,} of {stats['chars_in']:,} characters removed ({share:.1%}): "
+            f"{stats['boilerplate_chars']:,} boilerplate, {stats['duplicate_chars']:,} duplicate pages")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Strip boilerplate and near-duplicate pages from scraped JSONL.")
+    parser.add_argument("input", nargs="?", default="humboldt_body_links_text.jsonl")
+    parser.add_argument("output", nargs="?", default="humboldt_body_links_text.dedup.jsonl")
+    parser.add_argument("--threshold", type=float, default=0.85, help="estimated Jaccard similarity that counts as a duplicate")
+    parser.add_argument("--boilerplate-share", type=float, default=0.3, help="share of pages a shingle must appear on to be boilerplate")
+    args = parser.parse_args()
+
+    try:
+        stats = dedup_file(args.input, args.output, threshold=args.threshold, boilerplate_share=args.boilerplate_share)
+    except FileNotFoundError as e:
+        print(f" Input file not found: {e.filename}")
+        sys.exit(1)
+
+    print(report(stats))
+    print(f" Cleaned pages saved as: {args.output}")
@@ -0,0 +1,110 @@
+from functools import lru_cache
+
+from context_window import estimate_tokens
+
+#Prompt templates for george_rag.py, built once per knowledge base.
+#Everything that never changes (instructions, worked example, glossary) sits in a byte-identical
+#prefix at the very start, so provider-side prompt caching can reuse it across requests.
+#Per-request parts (search results, conversation history, output format, the question) come after it.
+#Bedrock fills $search_results$ and $output_format_instructions$ itself on the retrieve_and_generate path.
+
+QUERY_AGENT_INSTRUCTIONS = (
+    "You are a query creation agent. The user will provide you a question, and your job is to create "
+    "a step by step instructions to perform the query. Always start with a brief summary of the query, "
+    "then provide detailed steps to perform the query. Use the following format in the example below:"
+)
+
+PROCARD_EXAMPLE = """The procard reconciliation process is a crucial task for cardholders to ensure that all transactions are accurately recorded and submitted for approval.
+
+Accessing ProCard Reconciliations in PeopleSoft
+
+●	Step 1: Receive email notification from AP:
+●	Accounts Payable sends monthly email notifications to let cardholders know when reconciliations are available for edits/processing.
+●	Step 2: Access Statement in PeopleSoft
+●	Once available, reconciliations can be accessed in PeopleSoft Finance (CFS) through myHumboldt:
+
+●	Once in PeopleSoft Finance, select the Accounts Payable Tile. From there, click the ProCard dropdown that will appear on the left side of your screen. Select “ProCard Adjustment” from the drop down.
+
+●	From the ProCard Adjustment search screen, you must first select the Business Unit your ProCard falls under by either entering it manually in the Business Unit search bar, or by accessing the full list of Business Units by clicking the magnifying glass at the end of it.
+●	The Origin line must then be filled in the same manner. The Origin line should always be set to USB, regardless of your Business Unit.
+●	Once your Business Unit & Origin are selected, you can search for your reconciliation by entering your first and/or last name and then clicking the blue “Search” button.
+
+●	Once you hit search, you should be automatically taken to the following screen, where your current reconciliation should be available for processing.
+
+●	Your first transaction of this reconciliation’s cycle will be displayed. To view the next transaction, you can press the arrow keys located in the top right of the Transactions field. You can also select View All to bring up all of your transactions for this cycle at once.
+
+●	Step 3: Update Descriptions & Chartfields
+●	For each transaction, there are two main components you must fill out: the Description, and the Chartfield string. For the Description field, a simple explanation of what the purchase was and what it was for will suffice.
+○	You can add any information that may be helpful to you and your department here as it will show in OBI in the description field. This can support future budget analysis or research on historical transactions.
+
+●	The Chartfield string is entered under the Distribution field. This will already be filled with the default chartfield you entered on your ProCard application. If the charge should be allocated to a different Chartfield, you can change each manually, or search for specific Chartfields using the magnifying glass for each field. Questions regarding what specific Chartfields you should use should be fielded by your department’s Budget Analyst.
+●	RECOMMENDED: While filling out these fields, periodically click the blue “Save” button in the bottom right corner to avoid losing any progress.
+
+●	If you want to distribute multiple amounts within a single expense’s total to different chartfields, you can add/remove rows using +/- signs on the right side of the field. The line items must add up to the expense’s original total, or an error will occur. Example:
+
+●	Step 4: Generate & Download ProCard Report:
+●	Once you have finished filling out the Descriptions & Chartfields for all of your transactions, click the small Print Report button (printer icon) located next to Process Monitor near the top of your screen. Then, click Process Monitor to access your Process List.
+
+●	Your ProCard report should appear at the top of this list, with “SQR Report” listed under the Process Type. It typically takes a moment for the report to generate. Click the top right “Refresh” button to refresh the report’s status.Once the report is generated, the Run Status will be “Success”, and the Distribution Status will be “Posted”. Once the report has been generated, click the “Details” hyperlink.
+
+●	From the File List, click the hyperlink for the PDF file in the middle of the list. This will download a PDF copy of your ProCard report that will serve as the cover page of your ProCard Reconciliation Submission.
+
+●	Step 5: Prepare Reconciliation Submission Adobe:
+●	Once you have downloaded the report, open both it and any backup documentation files (invoices, receipts, Hospitality forms, Lost Receipt Memos, approvals, etc.) you have in Adobe Acrobat. Once every file is open, select “Combine Files” under Tools, then “Add Open Files”.
+●	Once at the Combine screen, you can click and drag each individual document to determine the order they appear in (left-most is first.) Backup documentation should be organized in the same order as their corresponding transactions on your ProCard report.
+●	After your documents are in order, hold the Ctrl key and click each file until they are all highlighted, as shown below, and then click combine. (You can also hold click and drag your cursor across the documents to select them all.)
+
+●	Step 6: Save final Reconciliation and submit through the Submission Portal:
+●	Save the combined document Binder as a single PDF, and submit the entire file for signature through the ProCard Reconciliation Submission portal, located at this link:https://policy.humboldt.edu/procard-reconciliation-submission.
+●	On that webpage, you will also find an additional guide titled “ProCard Reconciliation Submission Guide” that will instruct you on how to properly route your submission through the Adobe Submission portal."""
+
+GLOSSARY = "onboarding = hire"
+
+HISTORY_TURNS = 3
+HISTORY_ANSWER_CHARS = 500
+
+class PromptTemplate:
+    def __init__(self, instructions, example=None, glossary=None):
+        parts = [instructions.strip()]
+        if example:
+            parts.append(f"<example>\n{example.strip()}\n</example>")
+        if glossary:
+            parts.append(glossary.strip())
+        self.prefix = "\n\n".join(parts) + "\n\n"
+        self.prefix_tokens = estimate_tokens(self.prefix)
+
+    def retrieve_and_generate_template(self, history):
+        #textPromptTemplate for the KB generation step
+        return (self.prefix
+                + "Here are the search results:\n$search_results$\n\n"
+                + f"Here is the current conversation history:\n{history}\n\n"
+                + "$output_format_instructions$")
+
+    def converse_prompt(self, history, passages, query):
+        #(system text, user text) for generation over locally retrieved passages
+        results = "\n".join(
+            f"<search_result source=\"{p['url']}\">\n{p['text']}\n</search_result>" for p in passages
+        )
+        user_text = (f"<search_results>\n{results}\n</search_results>\n\n"
+                     f"Here is the current conversation history:\n{history}\n\n{query}")
+        return self.prefix, user_text
+
+DEFAULT_TEMPLATE = {"instructions": QUERY_AGENT_INSTRUCTIONS, "example": PROCARD_EXAMPLE, "glossary": GLOSSARY}
+
+# Per-KB overrides, keyed by KB id; anything not listed uses DEFAULT_TEMPLATE
+KB_TEMPLATES = {}
+
+@lru_cache(maxsize=None)
+def get_template(kb_id):
+    return PromptTemplate(**KB_TEMPLATES.get(kb_id, DEFAULT_TEMPLATE))
+
+def format_history(turns, max_turns=HISTORY_TURNS):
+    #Last few (question, answer) pairs; "$" is dropped so user text can never look like a Bedrock placeholder
+    if not turns:
+        return "(none)"
+    lines = []
+    for question, answer in turns[-max_turns:]:
+        if len(answer) > HISTORY_ANSWER_CHARS:
+            answer = answer[:HISTORY_ANSWER_CHARS] + "..."
+        lines.append(f"User: {question}\nAssistant: {answer}")
+    return "\n".join(lines).replace("$", "")
@@ -0,0 +1,35 @@
+import json
+import os
+
+#The query log: JSONL lines {"query": ..., "route": ...} that george_rag.py appends whenever a user picks
+#a KB by hand, and kb_router.py trains on. It keeps users' raw questions, so it is only written when
+#HUMBLE_HELPER_QUERY_LOG names the file. Kept free of numpy so the Bedrock-only app can log without it.
+
+QUERY_LOG_ENV = "HUMBLE_HELPER_QUERY_LOG"
+QUERY_LOG_PATH = "query_log.jsonl"
+
+def query_log_path():
+    #Where the log is written, None while logging is off
+    return os.environ.get(QUERY_LOG_ENV) or None
+
+def read_query_log(path=None):
+    #[(query, route)] from `path`, by default the log being written (or query_log.jsonl if logging is off)
+    path = path or query_log_path() or QUERY_LOG_PATH
+    examples = []
+    if not os.path.exists(path):
+        return examples
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                examples.append((entry["query"], entry["route"]))
+            except (ValueError, KeyError):
+                continue
+    return examples
+
+def log_query(query, route, path=None):
+    path = path or query_log_path()
+    if not path:
+        return
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"query": query, "route": route}) + "\n")
@@ -0,0 +1,179 @@
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+#Timing spans and counters for the chat apps and the scrapers.
+#Off unless one of these is set (or enable() is called):
+#  HUMBLE_HELPER_TELEMETRY_FILE - append one JSON line per finished span
+#  HUMBLE_HELPER_TELEMETRY_PORT - serve totals as Prometheus text on http://localhost:<port>/metrics
+#When off, span() hands back one shared no-op object and count() returns at once, so the
+#instrumented code pays a global lookup and a function call.
+#  with span("retrieve", kb=kb_id) as s:
+#      ...
+#      s.add("input_tokens", 812)
+#`python telemetry.py summarize spans.jsonl` prints per-span latency percentiles from a JSONL file.
+
+PREFIX = "humble_helper"
+
+ENABLED = False
+_lock = threading.Lock()
+_counters = {}
+_timings = {}
+_writer = None
+_server = None
+
+class NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, key, value=1):
+        pass
+
+    def set(self, key, value):
+        pass
+
+NOOP_SPAN = NoopSpan()
+
+class Span:
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.counts = {}
+        self.fields = {}
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.fields["error"] = getattr(exc, "code", exc_type.__name__)
+            self.counts["errors"] = 1
+        record(self.name, seconds, self.labels, self.counts, self.fields)
+        return False
+
+    def add(self, key, value=1):
+        #Quantities (tokens, bytes, cache hits) are also summed into <span>_<key> counters
+        self.counts[key] = self.counts.get(key, 0) + value
+
+    def set(self, key, value):
+        #Descriptive fields only go to the JSONL line
+        self.fields[key] = value
+
+def span(name, **labels):
+    if not ENABLED:
+        return NOOP_SPAN
+    return Span(name, labels)
+
+def count(name, value=1, **labels):
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def record(name, seconds, labels, counts, fields):
+    label_key = tuple(sorted(labels.items()))
+    with _lock:
+        timing = _timings.setdefault((name, label_key), [0, 0.0, 0.0])
+        timing[0] += 1
+        timing[1] += seconds
+        timing[2] = max(timing[2], seconds)
+        for field, value in counts.items():
+            key = (f"{name}_{field}", label_key)
+            _counters[key] = _counters.get(key, 0) + value
+    if _writer is not None:
+        _writer.write({"ts": round(time.time(), 3), "span": name, "seconds": round(seconds, 6),
+                       **labels, **counts, **fields})
+
+class JsonlWriter:
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, entry):
+        line = json.dumps(entry, default=str) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+
+def label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in labels) + "}"
+
+def prometheus_text():
+    lines = []
+    with _lock:
+        timings = sorted(_timings.items())
+        counters = sorted(_counters.items())
+    for (name, labels), (calls, total, longest) in timings:
+        lines.append(f"{PREFIX}_{name}_seconds_count{label_text(labels)} {calls}")
+        lines.append(f"{PREFIX}_{name}_seconds_sum{label_text(labels)} {total:.6f}")
+        lines.append(f"{PREFIX}_{name}_seconds_max{label_text(labels)} {longest:.6f}")
+    for (name, labels), value in counters:
+        lines.append(f"{PREFIX}_{name}_total{label_text(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def enable(path=None, port=None):
+    #Safe to call more than once (Streamlit reruns); the first file and port stay in use
+    global ENABLED, _writer, _server
+    with _lock:
+        if path and _writer is None:
+            _writer = JsonlWriter(path)
+        if port and _server is None:
+            _server = ThreadingHTTPServer(("127.0.0.1", int(port)), MetricsHandler)
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+        ENABLED = True
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timings.clear()
+
+def summarize(path):
+    samples = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            samples.setdefault(entry["span"], []).append(entry["seconds"])
+    for name, seconds in sorted(samples.items()):
+        seconds.sort()
+        pick = lambda q: seconds[min(len(seconds) - 1, int(q * len(seconds)))] * 1000
+        print(f"{name:<24} n={len(seconds):<6} p50 {pick(0.5):9.1f} ms  p95 {pick(0.95):9.1f} ms  "
+              f"max {seconds[-1] * 1000:9.1f} ms  total {sum(seconds):8.2f}s")
+
+if os.environ.get("HUMBLE_HELPER_TELEMETRY_FILE") or os.environ.get("HUMBLE_HELPER_TELEMETRY_PORT"):
+    enable(os.environ.get("HUMBLE_HELPER_TELEMETRY_FILE"), os.environ.get("HUMBLE_HELPER_TELEMETRY_PORT"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a telemetry JSONL file.")
+    parser.add_argument("command", choices=["summarize"])
+    parser.add_argument("path")
+    args = parser.parse_args()
+    summarize(args.path)
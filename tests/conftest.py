@@ -0,0 +1,8 @@
+import os
+import sys
+
+#The root modules and the scrapers (which import each other as top-level modules) both need to be importable
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "webScraping")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,62 @@
+import sqlite3
+
+import pytest
+
+from answer_cache import AnswerCache, anchor_tokens
+
+KB = "QTYWCMLKR0"
+MODEL = "model"
+QUESTION = "What documents do I need to submit to apply for graduate financial aid at Humboldt"
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnswerCache(str(tmp_path / "cache.sqlite3"))
+
+def test_exact_hit_ignores_case_spacing_and_punctuation(cache):
+    cache.put(KB, MODEL, "How do I apply?", "answer", 1.0)
+    assert cache.get(KB, MODEL, "  how do i   APPLY ") == "answer"
+    assert cache.get("OTHER", MODEL, "How do I apply?") is None
+
+def test_semantic_hit_on_close_paraphrase(cache):
+    cache.put(KB, MODEL, QUESTION, "answer", 1.0)
+    assert cache.get(KB, MODEL, QUESTION + " please") == "answer"
+    assert cache.get(KB, MODEL, QUESTION + " please", semantic=False) is None
+    assert cache.stats["semantic_hits"] == 1
+
+@pytest.mark.parametrize("cached, asked", [
+    ("When is the NSF grant deadline?", "When is the NIH grant deadline?"),
+    ("What is the research board meeting schedule in march", "What is the research board meeting schedule in april"),
+    ("Where do I submit form 700?", "Where do I submit form 701?"),
+    ("What are the library hours", "What are the library hours today"),
+    ("How do I reach the office of Dean Smith", "How do I reach the office of Dean Jones"),
+])
+def test_near_misses_differing_in_anchors_never_hit(tmp_path, cached, asked):
+    #Even with a threshold every pair clears, different numbers, acronyms, names or dates are a miss
+    loose = AnswerCache(str(tmp_path / "loose.sqlite3"), semantic_threshold=0.5)
+    loose.put(KB, MODEL, cached, "answer", 1.0)
+    assert anchor_tokens(cached) != anchor_tokens(asked)
+    assert loose.get(KB, MODEL, asked) is None
+
+def test_anchors_skip_sentence_starts_and_keep_acronyms():
+    assert anchor_tokens("When is the NSF deadline? Where is Founders Hall") == "founders hall nsf"
+    assert anchor_tokens("How do I apply for financial aid?") == ""
+
+def test_rows_from_before_anchors_only_match_exactly(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    db = sqlite3.connect(path)
+    db.execute("""CREATE TABLE answers (key TEXT PRIMARY KEY, kb_id TEXT, model TEXT, query TEXT, answer TEXT,
+                  embedding BLOB, latency REAL, created REAL, last_used REAL)""")
+    db.commit()
+    db.close()
+    old = AnswerCache(path)
+    old.put(KB, MODEL, QUESTION, "answer", 1.0)
+    old.db.execute("UPDATE answers SET anchors = NULL")
+    assert old.get(KB, MODEL, QUESTION) == "answer"
+    assert old.get(KB, MODEL, QUESTION + " please") is None
+
+def test_invalidate_drops_one_kb(cache):
+    cache.put(KB, MODEL, "a", "1", 1.0)
+    cache.put("OTHER", MODEL, "a", "2", 1.0)
+    assert cache.invalidate(KB) == 1
+    assert cache.get(KB, MODEL, "a") is None
+    assert cache.get("OTHER", MODEL, "a") == "2"
@@ -0,0 +1,63 @@
+import pytest
+
+import bench_load
+import george_rag
+from bedrock_client import BedrockClient
+from fake_bedrock import FakeBedrockAgentRuntime, FakeBedrockRuntime
+
+SLOW_KB = "IYGP2BMJEG"
+
+@pytest.fixture
+def fakes(monkeypatch):
+    #bench_load.install() for george_rag only, undone after the test
+    runtime = FakeBedrockRuntime(first_token_delay=0.01, token_delay=0.0)
+    agent = FakeBedrockAgentRuntime(retrieve_delay=0.02, generate_delay=0.02, kb_delays={SLOW_KB: 1.5})
+    monkeypatch.setattr(george_rag, "bedrock_agent", BedrockClient(agent))
+    monkeypatch.setattr(george_rag, "bedrock_runtime", BedrockClient(runtime))
+    monkeypatch.setattr(george_rag, "get_answer_cache", bench_load.NullCache)
+    monkeypatch.setattr(george_rag, "KB_TIMEOUT", 0.5)
+    return runtime, agent
+
+def test_slow_kb_does_not_starve_search_all(fakes):
+    #One KB far past its deadline on every call must not take the other KBs' retrievals down with it
+    corpus = [("When is the next board meeting?", george_rag.SEARCH_ALL_KB_ID)]
+    samples, seconds = bench_load.replay(None, corpus, qps=30, requests=45, threads=32)
+    summary = bench_load.summarize(samples, seconds)["ALL"]
+    assert summary["requests"] == 45
+    assert summary["errors"] == {}
+    assert summary["p95"] < 1.5
+
+def test_percentile_is_nearest_rank():
+    values = list(range(60))
+    assert bench_load.percentile(values, 95) == 56
+    assert bench_load.percentile(values, 50) == 29
+    assert bench_load.percentile(values, 100) == 59
+    assert bench_load.percentile([7], 99) == 7
+    assert bench_load.percentile([], 95) is None
+
+def test_no_requests_still_reports():
+    samples, seconds = bench_load.replay(None, [("q", bench_load.CHAT_TARGET)], qps=10, requests=0)
+    summary = bench_load.summarize(samples, seconds)
+    assert summary["total"]["p50"] is None
+    assert "total" in bench_load.report(summary)
+    assert bench_load.failures(summary, max_p95=1.0, max_error_rate=0.1) == []
+
+def test_unexpected_exception_is_recorded(monkeypatch):
+    def broken(*args, **kwargs):
+        raise KeyError("route")
+    monkeypatch.setattr(bench_load, "run_request", broken)
+    samples, seconds = bench_load.replay(None, [("q", george_rag.SEARCH_ALL_KB_ID)], qps=50, requests=3)
+    summary = bench_load.summarize(samples, seconds)["total"]
+    assert summary["requests"] == 3
+    assert summary["errors"] == {"KeyError": 3}
+
+def test_unread_stream_releases_its_slot():
+    runtime = FakeBedrockRuntime(first_token_delay=0.0, token_delay=0.0, max_concurrency=1)
+    messages = [{"role": "user", "content": [{"text": "hi"}]}]
+    response = runtime.converse_stream(modelId="m", messages=messages)
+    assert runtime.in_flight == 1
+    del response
+    assert runtime.in_flight == 0
+    events = list(runtime.converse_stream(modelId="m", messages=messages)["stream"])
+    assert events[-1]["metadata"]
+    assert runtime.in_flight == 0
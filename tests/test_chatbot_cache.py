@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+from answer_cache import AnswerCache
+
+os.environ.setdefault("HUMBLE_HELPER_FAKE_BEDROCK", "1")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Streamlit"))
+import chatbot
+
+FIRST = "What documents do I need to submit to apply for graduate financial aid at Humboldt"
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = AnswerCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(chatbot, "get_answer_cache", lambda: cache)
+    return cache
+
+def conversation(*user_turns):
+    messages = []
+    for turn in user_turns:
+        messages += [{"role": "user", "content": turn}, {"role": "assistant", "content": "..."}]
+    return messages[:-1]
+
+def test_opening_question_can_hit_semantically(cache):
+    cache.put(chatbot.CHAT_CACHE_KB, chatbot.MODEL_ID, FIRST, "answer", 1.0)
+    messages = conversation(FIRST + " please")
+    assert chatbot.cached_answer(messages, chatbot.conversation_cache_key(messages)) == "answer"
+
+def test_follow_ups_only_hit_exactly(cache):
+    earlier = conversation(FIRST, "and what is the deadline for the fall term")
+    cache.put(chatbot.CHAT_CACHE_KB, chatbot.MODEL_ID, chatbot.conversation_cache_key(earlier), "answer", 1.0)
+    assert chatbot.cached_answer(earlier, chatbot.conversation_cache_key(earlier)) == "answer"
+    follow_up = conversation(FIRST, "and what is the deadline for the fall term please")
+    assert chatbot.cached_answer(follow_up, chatbot.conversation_cache_key(follow_up)) is None
@@ -0,0 +1,44 @@
+import os
+
+import pytest
+from streamlit.delta_generator_singletons import get_dg_singleton_instance
+from streamlit.testing.v1 import AppTest
+
+os.environ.setdefault("HUMBLE_HELPER_FAKE_BEDROCK", "1")
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Streamlit", "chatbot.py")
+
+MESSAGES = [
+    {"role": "assistant", "content": "Hi! How can I assist you?"},
+    {"role": "user", "content": "How do I apply for a research grant?"},
+    {"role": "assistant", "content": "First, find a sponsor.\n\nThen submit the proposal."},
+    {"role": "user", "content": "Thanks"},
+]
+
+@pytest.fixture(autouse=True)
+def fresh_layout(monkeypatch):
+    # Importing chatbot in bare mode (the other tests do) leaves its form attached to the main container,
+    # which AppTest would then run the whole script inside
+    monkeypatch.setattr(get_dg_singleton_instance().main_dg, "_form_data", None)
+
+def bubbles(at):
+    return [m.value for m in at.markdown if 'class="message-bubble"' in m.value]
+
+def test_each_message_is_its_own_markdown_element():
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.session_state["messages"] = [dict(m) for m in MESSAGES]
+    at.run()
+    assert not at.exception
+    rendered = bubbles(at)
+    # A blank line inside one answer must not swallow the bubbles after it into the same block
+    assert len(rendered) == len(MESSAGES)
+    assert all(html.count('class="message-bubble"') == 1 for html in rendered)
+    assert "Then submit the proposal." in rendered[2]
+
+def test_rerun_reuses_rendered_history():
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.session_state["messages"] = [dict(m) for m in MESSAGES[:2]]
+    at.run()
+    at.session_state["messages"] = at.session_state["messages"] + [dict(m) for m in MESSAGES[2:]]
+    at.run()
+    assert len(at.session_state["message_html"]) == len(MESSAGES)
+    assert len(bubbles(at)) == len(MESSAGES)
@@ -0,0 +1,27 @@
+from context_window import ContextWindow, estimate_tokens
+
+def conversation(turns, words=60):
+    messages = [{"role": "assistant", "content": "Hi! How can I help?"}]
+    for n in range(turns):
+        messages.append({"role": "user", "content": f"question {n} " + "word " * words})
+        messages.append({"role": "assistant", "content": f"answer {n} " + "word " * words})
+    return messages
+
+def test_token_counts_are_bounded():
+    window = ContextWindow(token_cache_size=8)
+    for n in range(100):
+        assert window.tokens(f"message {n}") == estimate_tokens(f"message {n}")
+    assert window.tokens.cache_info().currsize == 8
+
+def test_old_turns_fold_into_summary_within_budget():
+    window = ContextWindow(budget=300, summary_budget=100)
+    state = {}
+    sent, system, stats = window.build(conversation(20), state)
+    assert stats["prompt_tokens"] <= 300
+    assert sent[0]["role"] == "user" and sent[-1]["content"].startswith("answer 19")
+    assert system.startswith("Summary of the earlier conversation") and window.tokens(system) <= 100
+    assert state["covered"] == stats["messages_summarized"] > 0
+
+def test_greeting_is_never_sent():
+    sent, system, _ = ContextWindow().build(conversation(1), {})
+    assert [msg["role"] for msg in sent] == ["user", "assistant"] and system is None
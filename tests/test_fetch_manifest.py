@@ -0,0 +1,42 @@
+import hashlib
+
+from fetch_manifest import FetchManifest
+
+URL = "https://www.humboldt.edu/research/forms"
+BODY = b"<html><body>Forms library</body></html>"
+
+class Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+def test_conditional_headers_come_from_the_last_response(tmp_path):
+    manifest = FetchManifest(str(tmp_path / "manifest.json"))
+    assert manifest.conditional_headers(URL) == {}
+    manifest.record_response(URL, Response({"ETag": '"v1"', "Last-Modified": "Mon, 05 Oct 2026 10:00:00 GMT"}), BODY)
+    assert manifest.conditional_headers(URL) == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 05 Oct 2026 10:00:00 GMT"}
+
+def test_record_download_reports_changes_by_hash(tmp_path):
+    manifest = FetchManifest(str(tmp_path / "manifest.json"))
+    digest = hashlib.sha256(BODY).hexdigest()
+    assert manifest.record_download(URL, Response({"ETag": '"v1"'}), digest, len(BODY), len(BODY))
+    # A new ETag on the same bytes is not a change
+    assert not manifest.record_download(URL, Response({"ETag": '"v2"'}), digest, len(BODY), 0)
+    assert manifest.get(URL, "etag") == '"v2"'
+    assert manifest.stats["changed"] == 1 and manifest.stats["unchanged"] == 1
+    assert manifest.stats["bytes_saved"] == len(BODY)
+
+def test_save_and_reload(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = FetchManifest(path)
+    manifest.record_response(URL, Response({"ETag": '"v1"'}), BODY)
+    manifest.set(URL, "links", ["https://www.humboldt.edu/research"])
+    manifest.save()
+    reloaded = FetchManifest(path)
+    assert reloaded.entries == manifest.entries
+    reloaded.forget([URL])
+    assert reloaded.conditional_headers(URL) == {}
+
+def test_unreadable_manifest_starts_empty(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text("{not json")
+    assert FetchManifest(str(path)).entries == {}
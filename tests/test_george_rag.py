@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+os.environ.setdefault("HUMBLE_HELPER_FAKE_BEDROCK", "1")
+import george_rag
+
+class Index:
+    def __init__(self, name):
+        self.name = name
+
+    def search(self, query, k=3, **kwargs):
+        return [{"url": self.name, "text": query, "score": 1.0}][:k]
+
+    def search_batch(self, queries, k=3):
+        return [[{"url": self.name + "-batch", "text": q, "score": 1.0}] for q in queries]
+
+@pytest.fixture
+def kbs(monkeypatch):
+    monkeypatch.setattr(george_rag, "KB_OPTIONS", {
+        "Local": {"kb_id": "LOCAL", "retrieval": "local", "local_index": "indexes/local"},
+        "Hybrid": {"kb_id": "HYBRID", "retrieval": "hybrid", "local_index": "indexes/hybrid"},
+        "Remote": {"kb_id": "REMOTE", "retrieval": "bedrock"},
+        "Broken": {"kb_id": "BROKEN", "retrieval": "local"},
+    })
+    monkeypatch.setattr(george_rag, "get_local_index", Index)
+    monkeypatch.setattr(george_rag, "get_hybrid_index", Index)
+    monkeypatch.setattr(george_rag, "retrieve_bedrock", lambda kb_id, query, k: [{"url": kb_id, "text": query, "score": 1.0}])
+
+def test_retrieve_batch_follows_retrieval_setting(kbs):
+    assert george_rag.retrieve_batch("LOCAL", ["a", "b"])[1][0]["url"] == "indexes/local"
+    assert george_rag.retrieve_batch("HYBRID", ["a", "b"])[1][0]["url"] == "indexes/hybrid-batch"
+    assert george_rag.retrieve_batch("REMOTE", ["a"]) == [[{"url": "REMOTE", "text": "a", "score": 1.0}]]
+
+def test_retrieve_batch_without_local_index(kbs):
+    with pytest.raises(ValueError, match="no local_index"):
+        george_rag.retrieve_batch("BROKEN", ["a"])
@@ -0,0 +1,62 @@
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import kb_sync
+from page_stream import write_pages
+
+BUCKET = "kb-test"
+KB_ID = "QTYWCMLKR0"
+PAGES = [{"url": f"https://www.humboldt.edu/research/{name}", "text": f"All about {name}."}
+         for name in ("forms", "grants", "deadlines")]
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+@pytest.fixture
+def corpus(tmp_path):
+    return str(tmp_path / "pages.jsonl")
+
+def sync(s3, corpus, state_path):
+    config = {"bucket": BUCKET, "knowledge_bases": {KB_ID: {"prefix": "general", "sources": [corpus]}}}
+    _, stats = kb_sync.sync_all(config, s3, state=kb_sync.SyncState(state_path), workers=2)
+    return stats.values
+
+def keys(s3):
+    return sorted(o["Key"] for o in s3.list_objects_v2(Bucket=BUCKET).get("Contents", []))
+
+def test_first_sync_uploads_everything_and_saves_state(s3, corpus, tmp_path):
+    write_pages(PAGES, corpus)
+    state_path = str(tmp_path / "state.json")
+    stats = sync(s3, corpus, state_path)
+    assert stats["uploaded"] == 3 and stats["deleted"] == 0
+    assert len(keys(s3)) == 6
+    with open(state_path, encoding="utf-8") as f:
+        assert len(json.load(f)[KB_ID]) == 3
+
+def test_unchanged_documents_are_neither_uploaded_nor_deleted(s3, corpus, tmp_path):
+    write_pages(PAGES, corpus)
+    state_path = str(tmp_path / "state.json")
+    sync(s3, corpus, state_path)
+    before = keys(s3)
+    write_pages(PAGES[:2] + [dict(PAGES[2], text="Deadlines moved to May.")], corpus)
+    stats = sync(s3, corpus, state_path)
+    assert stats["unchanged"] == 2 and stats["uploaded"] == 1 and stats["deleted"] == 0
+    assert keys(s3) == before
+
+def test_document_dropped_from_the_corpus_is_deleted(s3, corpus, tmp_path):
+    write_pages(PAGES, corpus)
+    state_path = str(tmp_path / "state.json")
+    sync(s3, corpus, state_path)
+    write_pages(PAGES[1:], corpus)
+    stats = sync(s3, corpus, state_path)
+    gone = kb_sync.doc_id(PAGES[0]["url"], 0)
+    assert stats["deleted"] == 1
+    assert not any(gone in key for key in keys(s3)) and len(keys(s3)) == 4
+    assert gone not in kb_sync.SyncState(state_path).hashes(KB_ID)
@@ -0,0 +1,26 @@
+import random
+
+from page_dedup import dedup_file
+from page_stream import read_pages, write_pages
+
+HEADER = "Cal Poly Humboldt Home Admissions Academics Research Campus Life Athletics About Give"
+FOOTER = "1 Harpst Street Arcata California 95521 Contact Us Privacy Accessibility Emergency"
+
+def body(seed, words=120):
+    rng = random.Random(seed)
+    return " ".join(f"word{rng.randrange(5000)}" for _ in range(words))
+
+def test_strips_shared_boilerplate_and_near_duplicates(tmp_path):
+    pages = [{"url": f"https://www.humboldt.edu/page{i}", "text": f"{HEADER} {body(i)} {FOOTER}"} for i in range(6)]
+    near_copy = pages[0]["text"] + " updated"
+    pages.append({"url": "https://www.humboldt.edu/page0?print=1", "text": near_copy})
+    pages.append({"url": "https://www.humboldt.edu/empty", "text": f"{HEADER} {FOOTER}"})
+    write_pages(pages, str(tmp_path / "pages.jsonl"))
+
+    stats = dedup_file(str(tmp_path / "pages.jsonl"), str(tmp_path / "clean.jsonl"))
+    out = list(read_pages(str(tmp_path / "clean.jsonl")))
+
+    assert [page["url"] for page in out] == [page["url"] for page in pages[:6]]
+    assert stats["duplicates"] == 1 and stats["empty"] == 1
+    assert all("Harpst" not in page["text"] and "Admissions" not in page["text"] for page in out)
+    assert out[3]["text"] == body(3)
@@ -0,0 +1,131 @@
+import hashlib
+import importlib
+import os
+
+import pytest
+
+from fetch_manifest import FetchManifest
+import telemetry
+
+URL = "https://www.humboldt.edu/files/minutes.pdf"
+BODY = b"%PDF-1.4 " + b"x" * 1000
+
+class Response:
+    def __init__(self, status_code, body=b"", headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+class Session:
+    #Answers each GET with the next scripted response and keeps the request headers
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, timeout=None, headers=None, stream=False):
+        self.requests.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+@pytest.fixture
+def pdf_scraper(tmp_path, monkeypatch):
+    #pdf_scraper creates its download directory on import, keep that out of the checkout
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module("pdf_scraper")
+
+def fetch(pdf_scraper, tmp_path, session, manifest):
+    return pdf_scraper.fetch_pdf(URL, str(tmp_path / "minutes.pdf"), session, manifest, None, telemetry.NOOP_SPAN)
+
+def test_resumes_with_validator(pdf_scraper, tmp_path):
+    manifest = FetchManifest(str(tmp_path / "manifest.json"))
+    manifest.set(URL, "partial", '"v1"')
+    (tmp_path / "minutes.pdf.part").write_bytes(BODY[:400])
+    session = Session(Response(206, BODY[400:], {"ETag": '"v1"'}))
+
+    assert fetch(pdf_scraper, tmp_path, session, manifest)
+    assert session.requests[0] == {"Range": "bytes=400-", "If-Range": '"v1"'}
+    assert (tmp_path / "minutes.pdf").read_bytes() == BODY
+    assert manifest.get(URL, "sha256") == hashlib.sha256(BODY).hexdigest()
+
+def test_no_validator_restarts_from_zero(pdf_scraper, tmp_path):
+    manifest = FetchManifest(str(tmp_path / "manifest.json"))
+    (tmp_path / "minutes.pdf.part").write_bytes(b"stale bytes from another version")
+    session = Session(Response(200, BODY, {"ETag": '"v2"'}))
+
+    assert fetch(pdf_scraper, tmp_path, session, manifest)
+    assert "Range" not in session.requests[0]
+    assert (tmp_path / "minutes.pdf").read_bytes() == BODY
+
+def test_416_on_complete_part_finishes_download(pdf_scraper, tmp_path):
+    manifest = FetchManifest(str(tmp_path / "manifest.json"))
+    manifest.set(URL, "partial", '"v1"')
+    (tmp_path / "minutes.pdf.part").write_bytes(BODY)
+    session = Session(Response(416, headers={"Content-Range": f"bytes */{len(BODY)}"}))
+
+    assert fetch(pdf_scraper, tmp_path, session, manifest)
+    assert len(session.requests) == 1
+    assert (tmp_path / "minutes.pdf").read_bytes() == BODY
+    assert not (tmp_path / "minutes.pdf.part").exists()
+    assert manifest.get(URL, "partial") is None
+    # The validator the .part was downloaded under is kept, so the next run still revalidates
+    session = Session(Response(304))
+    assert not fetch(pdf_scraper, tmp_path, session, manifest)
+    assert session.requests[0] == {"If-None-Match": '"v1"'}
+
+def test_416_on_mismatched_part_restarts(pdf_scraper, tmp_path):
+    manifest = FetchManifest(str(tmp_path / "manifest.json"))
+    manifest.set(URL, "partial", '"v1"')
+    (tmp_path / "minutes.pdf.part").write_bytes(BODY + b"trailing bytes")
+    session = Session(Response(416, headers={"Content-Range": f"bytes */{len(BODY)}"}),
+                      Response(200, BODY, {"ETag": '"v1"'}))
+
+    assert fetch(pdf_scraper, tmp_path, session, manifest)
+    assert "Range" not in session.requests[1]
+    assert (tmp_path / "minutes.pdf").read_bytes() == BODY
+
+def test_repeated_416_is_retried_once(pdf_scraper, tmp_path):
+    manifest = FetchManifest(str(tmp_path / "manifest.json"))
+    manifest.set(URL, "partial", '"v1"')
+    (tmp_path / "minutes.pdf.part").write_bytes(BODY + b"trailing bytes")
+    session = Session(Response(416, headers={"Content-Range": f"bytes */{len(BODY)}"}),
+                      Response(416), Response(416))
+
+    with pytest.raises(RuntimeError, match="416"):
+        fetch(pdf_scraper, tmp_path, session, manifest)
+    assert len(session.requests) == 2
+
+def test_repeated_links_are_downloaded_once(pdf_scraper, tmp_path, monkeypatch):
+    (tmp_path / pdf_scraper.DOWNLOAD_DIR).mkdir(exist_ok=True)
+    session = Session(Response(200, BODY, {"ETag": '"v1"'}))
+    monkeypatch.setattr(pdf_scraper, "make_session", lambda workers: session)
+    links = [(URL, "Minutes.pdf"), (URL.replace(".pdf", "-copy.pdf"), "minutes.pdf")]
+
+    changed = pdf_scraper.download_pdfs(links, FetchManifest(str(tmp_path / "manifest.json")))
+    assert len(session.requests) == 1
+    assert changed == [(URL, os.path.join(pdf_scraper.DOWNLOAD_DIR, "Minutes.pdf"))]
+
+def test_single_listing_page_links_are_merged(pdf_scraper):
+    links = [(URL, "Board - Minutes.pdf"), (URL, "Board - Minutes.pdf"), (URL + "?v=2", "Board - Minutes.pdf")]
+    assert pdf_scraper.merge_pdf_links([links]) == [(URL, "Board - Minutes.pdf"), (URL + "?v=2", "Board - Minutes (2).pdf")]
+
+def test_unchanged_download_keeps_existing_file(pdf_scraper, tmp_path):
+    manifest = FetchManifest(str(tmp_path / "manifest.json"))
+    (tmp_path / "minutes.pdf").write_bytes(BODY)
+    manifest.record_download(URL, Response(200, headers={"ETag": '"v1"'}), hashlib.sha256(BODY).hexdigest(), len(BODY), len(BODY))
+    session = Session(Response(304))
+
+    assert not fetch(pdf_scraper, tmp_path, session, manifest)
+    assert session.requests[0] == {"If-None-Match": '"v1"'}
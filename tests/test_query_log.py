@@ -0,0 +1,22 @@
+import kb_router
+from query_log import log_query, query_log_path, read_query_log
+
+QUERY = "zorblax quarterly frobnication"
+
+def test_logging_is_off_without_the_env_var(tmp_path, monkeypatch):
+    monkeypatch.delenv("HUMBLE_HELPER_QUERY_LOG", raising=False)
+    monkeypatch.chdir(tmp_path)
+    assert query_log_path() is None
+    log_query(QUERY, "peoplesoft")
+    assert list(tmp_path.iterdir()) == []
+
+def test_router_trains_on_the_log_the_app_writes(tmp_path, monkeypatch):
+    log_path = tmp_path / "opted_in.jsonl"
+    monkeypatch.setenv("HUMBLE_HELPER_QUERY_LOG", str(log_path))
+    monkeypatch.chdir(tmp_path)
+    for _ in range(20):
+        # What george_rag.py does for a hand-picked KB
+        log_query(QUERY, "peoplesoft")
+    assert read_query_log() == [(QUERY, "peoplesoft")] * 20
+    router = kb_router.default_router(str(tmp_path / "no_saved_model.npz"))
+    assert router.route(QUERY)[0] == "peoplesoft"
@@ -0,0 +1,99 @@
+import requests
+import pytest
+
+import scrape
+from fetch_manifest import FetchManifest
+from page_stream import read_pages, write_pages
+
+BASE = "https://www.humboldt.edu/research"
+FORMS = "https://www.humboldt.edu/research/forms"
+GRANTS = "https://www.humboldt.edu/research/grants"
+
+def page(text, *links):
+    anchors = "".join(f'<a href="{link}">{link}</a>' for link in links)
+    return f"<html><body><p>{text}</p>{anchors}</body></html>"
+
+class Response:
+    def __init__(self, status_code, html=""):
+        self.status_code = status_code
+        self.text = html
+        self.content = html.encode()
+        self.headers = {"Content-Type": "text/html", "ETag": f'"{hash(html)}"'} if status_code == 200 else {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+class Site:
+    #{url: html or a status code}; answers conditional requests with 304 like a real server
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get(self, url, timeout=None, headers=None):
+        html = self.pages.get(url, 404)
+        if isinstance(html, int):
+            return Response(html)
+        response = Response(200, html)
+        if (headers or {}).get("If-None-Match") == response.headers["ETag"]:
+            return Response(304)
+        return response
+
+@pytest.fixture
+def site(monkeypatch):
+    site = Site({BASE: page("Research home", FORMS, GRANTS),
+                 FORMS: page("Forms library"),
+                 GRANTS: page("Grant deadlines")})
+    monkeypatch.setattr(scrape, "make_session", lambda workers: site)
+    return site
+
+def run(tmp_path, manifest, **kwargs):
+    #What scrape.py's main does: stream the crawl to a side file, then merge it into the corpus
+    output = str(tmp_path / "pages.jsonl")
+    crawl = {}
+    write_pages(scrape.crawl_website(BASE, workers=2, rate=0, manifest=manifest, **kwargs, crawl=crawl), output + ".crawl")
+    total, dropped = scrape.merge_pages(output + ".crawl", output, crawl)
+    manifest.forget(dropped | crawl["gone"])
+    return {record["url"]: record["text"] for record in read_pages(output)}, dropped
+
+def test_unchanged_pages_stay_in_the_corpus(tmp_path, site):
+    manifest = FetchManifest(str(tmp_path / "manifest.json"))
+    run(tmp_path, manifest)
+    site.pages[GRANTS] = page("Grant deadlines moved")
+    corpus, dropped = run(tmp_path, manifest)
+    assert manifest.stats["not_modified"] == 2
+    assert set(corpus) == {BASE, FORMS, GRANTS}
+    assert corpus[FORMS].startswith("Forms library")
+    assert corpus[GRANTS].startswith("Grant deadlines moved")
+    assert dropped == set()
+
+def test_gone_page_is_dropped_and_forgotten(tmp_path, site):
+    manifest = FetchManifest(str(tmp_path / "manifest.json"))
+    run(tmp_path, manifest)
+    site.pages[FORMS] = 404
+    corpus, dropped = run(tmp_path, manifest)
+    assert set(corpus) == {BASE, GRANTS}
+    assert dropped == {FORMS}
+    assert manifest.get(FORMS, "sha256") is None
+
+def test_unlinked_page_is_dropped(tmp_path, site):
+    manifest = FetchManifest(str(tmp_path / "manifest.json"))
+    run(tmp_path, manifest)
+    site.pages[BASE] = page("Research home", FORMS)
+    corpus, dropped = run(tmp_path, manifest)
+    assert set(corpus) == {BASE, FORMS}
+    assert dropped == {GRANTS}
+
+def test_failed_crawl_keeps_pages_it_did_not_reach(tmp_path, site):
+    manifest = FetchManifest(str(tmp_path / "manifest.json"))
+    run(tmp_path, manifest)
+    site.pages[BASE] = 503
+    corpus, dropped = run(tmp_path, manifest)
+    assert set(corpus) == {BASE, FORMS, GRANTS}
+    assert dropped == set()
+
+def test_capped_crawl_keeps_pages_it_did_not_reach(tmp_path, site):
+    manifest = FetchManifest(str(tmp_path / "manifest.json"))
+    run(tmp_path, manifest)
+    corpus, dropped = run(tmp_path, manifest, max_pages=2)
+    assert set(corpus) == {BASE, FORMS, GRANTS}
+    assert dropped == set()
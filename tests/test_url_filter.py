@@ -0,0 +1,27 @@
+from url_filter import UrlFilter, remove_social_media_urls
+
+def test_subdomains_match_by_suffix():
+    url_filter = UrlFilter()
+    assert url_filter.is_blocked("https://m.facebook.com/humboldt")
+    assert url_filter.is_blocked("https://www.youtube.com/watch?v=1")
+    assert url_filter.is_blocked("https://FACEBOOK.com/")
+
+def test_lookalike_hosts_are_not_suffix_matches():
+    url_filter = UrlFilter()
+    assert not url_filter.is_blocked("https://notfacebook.com/")
+    assert not url_filter.is_blocked("https://facebook.com.example.org/")
+    assert not url_filter.is_blocked("https://www.humboldt.edu/facebook.com")
+
+def test_allow_list_wins():
+    url_filter = UrlFilter(deny=["humboldt.edu"], allow=["library.humboldt.edu"])
+    assert url_filter.is_blocked("https://www.humboldt.edu/")
+    assert not url_filter.is_blocked("https://library.humboldt.edu/hours")
+    assert not url_filter.is_blocked("https://a.library.humboldt.edu/")
+
+def test_clean_line_keeps_other_urls_and_userinfo_host():
+    line = "See https://user@twitter.com/x and https://www.humboldt.edu/research, thanks"
+    assert remove_social_media_urls(line) == "See  and https://www.humboldt.edu/research, thanks"
+
+def test_filter_lines_drops_lines_left_empty():
+    lines = ["https://instagram.com/a\n", "\n", "https://www.humboldt.edu/\n"]
+    assert list(UrlFilter().filter_lines(lines)) == ["\n", "https://www.humboldt.edu/\n"]
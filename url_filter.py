@@ -0,0 +1,99 @@
+import argparse
+import re
+import sys
+from urllib.parse import urlparse
+
+#Shared URL filtering for the link dumps in linkTextFile/.
+#Hosts are checked against domain sets by walking their suffixes, so m.facebook.com and
+#www.youtube.com are caught by "facebook.com" / "youtube.com" without building a regex per call.
+#Input is processed line by line, so memory stays flat no matter how big the crawl dump is.
+
+SOCIAL_MEDIA_DOMAINS = [
+    'facebook.com', 'twitter.com', 'instagram.com', 'linkedin.com',
+    'tiktok.com', 'youtube.com', 'pinterest.com', 'snapchat.com',
+    'discord.com', 'reddit.com'
+]
+
+#Group 1 is the host, pulled out by the same scan that finds the URL instead of a urlparse per URL
+URL_PATTERN = re.compile(r'https?://(?:[^\s/?#@]*@)?([^\s/?#:]+)[^\s]*', re.IGNORECASE)
+
+def load_domains(path):
+    #One domain per line, blank lines and # comments ignored
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.split("#")[0].strip() for line in f if line.split("#")[0].strip()]
+
+class UrlFilter:
+    def __init__(self, deny=SOCIAL_MEDIA_DOMAINS, allow=()):
+        self.deny = {domain.lower().strip(".") for domain in deny}
+        self.allow = {domain.lower().strip(".") for domain in allow}
+        self.cache = {}
+
+    @staticmethod
+    def matches(host, domains):
+        #True if host is one of the domains or a subdomain of one
+        parts = host.split(".")
+        for i in range(len(parts)):
+            if ".".join(parts[i:]) in domains:
+                return True
+        return False
+
+    def is_blocked(self, url):
+        return self.is_blocked_host((urlparse(url).hostname or "").lower())
+
+    def is_blocked_host(self, host):
+        #Allow list wins over deny list, e.g. allow "humboldt.edu" while denying a shared host
+        blocked = self.cache.get(host)
+        if blocked is None:
+            blocked = not self.matches(host, self.allow) and self.matches(host, self.deny)
+            if len(self.cache) < 100000:
+                self.cache[host] = blocked
+        return blocked
+
+    def clean_line(self, line):
+        return URL_PATTERN.sub(lambda m: "" if self.is_blocked_host(m.group(1).lower()) else m.group(0), line)
+
+    def filter_lines(self, lines):
+        #Yields cleaned lines, dropping the ones that held nothing but blocked URLs
+        for line in lines:
+            cleaned = self.clean_line(line)
+            if cleaned.strip() or not line.strip():
+                yield cleaned
+
+    def filter_file(self, input_path, output_path):
+        #Streams input_path into output_path, returns how many lines were kept
+        written = 0
+        with open(input_path, "r", encoding="utf-8") as infile, open(output_path, "w", encoding="utf-8") as outfile:
+            for line in self.filter_lines(infile):
+                outfile.write(line)
+                written += 1
+        return written
+
+DEFAULT_FILTER = UrlFilter()
+
+def remove_social_media_urls(text):
+    return DEFAULT_FILTER.clean_line(text)
+
+def main(default_input, default_output):
+    parser = argparse.ArgumentParser(description="Remove social media (or any denied) URLs from a link dump.")
+    parser.add_argument("input", nargs="?", default=default_input)
+    parser.add_argument("output", nargs="?", default=default_output)
+    parser.add_argument("--deny", nargs="*", default=[], help="extra domains to remove")
+    parser.add_argument("--deny-file", help="file of domains to remove, replaces the social media list")
+    parser.add_argument("--allow", nargs="*", default=[], help="domains to always keep")
+    parser.add_argument("--allow-file", help="file of domains to always keep")
+    args = parser.parse_args()
+
+    deny = load_domains(args.deny_file) if args.deny_file else list(SOCIAL_MEDIA_DOMAINS)
+    allow = list(args.allow) + (load_domains(args.allow_file) if args.allow_file else [])
+    url_filter = UrlFilter(deny + args.deny, allow)
+
+    try:
+        written = url_filter.filter_file(args.input, args.output)
+    except FileNotFoundError as e:
+        print(f" Input file not found: {e.filename}")
+        sys.exit(1)
+
+    print(f" Cleaned file saved as: {args.output} ({written} lines kept)")
+
+if __name__ == "__main__":
+    main("linkTextFile/external_links_from_research_pages.txt", "linkTextFile/cleaned_external_links_pages.txt")
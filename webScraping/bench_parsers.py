@@ -0,0 +1,64 @@
+import argparse
+import time
+
+from html_extract import BACKENDS, extract_page
+
+#Compares the HTML parser backends on saved pages, e.g.
+#  curl -o forms.html https://www.humboldt.edu/research/z-forms-library
+#  python bench_parsers.py forms.html board.html
+#Without arguments it times a generated listing page shaped like the board meetings archive.
+
+def make_listing_page(sections=60, docs=8):
+    nav = "".join(f'<li><a href="/research/section-{i}">Menu item {i}</a></li>' for i in range(150))
+    body = []
+    for s in range(sections):
+        body.append(f"<h3>Board Meeting {s} &amp; Committee</h3><ul>")
+        for d in range(docs):
+            body.append(f'<li><a href="/sites/default/files/board/{s}-{d}.pdf"><span>Agenda packet {d}</span></a> '
+                        f"<em>Posted</em> {d} days ago</li>")
+        body.append("</ul>")
+    return (f"<!DOCTYPE html><html><head><title>Minutes</title><script>var x = '<a href=1>';</script>"
+            f"<style>.a{{color:red}}</style></head><body><nav><ul>{nav}</ul></nav>"
+            f"<main>{''.join(body)}</main><footer><noscript>Enable JS</noscript>Cal Poly Humboldt</footer></body></html>")
+
+def available_backends():
+    backends = []
+    for backend in BACKENDS:
+        try:
+            extract_page("<html><body></body></html>", backend)
+            backends.append(backend)
+        except Exception as e:
+            print(f"[WARNING] Skipping {backend}: {e}")
+    return backends
+
+def time_backend(pages, backend, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            extract_page(html, backend)
+    return (time.perf_counter() - start) / (repeat * len(pages))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark the HTML parser backends.")
+    parser.add_argument("pages", nargs="*", help="saved HTML pages to parse")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = []
+        for path in args.pages:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+    else:
+        pages = [make_listing_page()]
+    size = sum(len(html) for html in pages) / len(pages)
+    print(f"{len(pages)} page(s), {size / 1024:.0f} KB average, {args.repeat} rounds")
+
+    backends = available_backends()
+    reference = [extract_page(html, "html.parser") for html in pages]
+    for backend in backends:
+        per_page = time_backend(pages, backend, args.repeat)
+        results = [extract_page(html, backend) for html in pages]
+        same = all(a.links == b.links and a.text == b.text for a, b in zip(results, reference))
+        print(f"{backend:<12} {per_page * 1000:8.2f} ms/page  {size / per_page / 1e6:6.1f} MB/s  "
+              f"matches html.parser: {'yes' if same else 'no'}")
@@ -0,0 +1,85 @@
+import argparse
+import os
+import random
+import tempfile
+
+from pdf_extract import extract_pdfs, report
+
+#Pages per second (and per core) of pdf_extract.py on a folder of PDFs.
+#Without --input it writes synthetic agenda/minutes packets: plain text PDFs with numbered
+#agenda headings, which is what the meetings listing mostly links to.
+
+WORDS = ("board motion approved budget committee report enrollment faculty senate policy review "
+         "student housing research grant update discussion chair vote minutes public comment").split()
+
+def pdf_text_stream(lines):
+    body = ["BT", "/F1 10 Tf", "12 TL", "50 760 Td"]
+    for line in lines:
+        escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        body.append(f"({escaped}) Tj T*")
+    body.append("ET")
+    return "\n".join(body).encode("latin-1")
+
+def write_pdf(path, pages):
+    #Minimal hand-rolled PDF: one Helvetica font, one content stream per page
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        stream = pdf_text_stream(lines)
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+def synthetic_pdfs(folder, count, pages, seed=0):
+    rng = random.Random(seed)
+    paths = []
+    for n in range(count):
+        packet = []
+        item = 1
+        for _ in range(pages):
+            lines = []
+            while len(lines) < 55:
+                if rng.random() < 0.08:
+                    lines.append(f"{item}. {rng.choice(WORDS).title()} {rng.choice(WORDS).title()}")
+                    item += 1
+                else:
+                    lines.append(" ".join(rng.choice(WORDS) for _ in range(12)))
+            packet.append(lines)
+        path = os.path.join(folder, f"Board_Meeting_{2000 + n} - Agenda_Packet.pdf")
+        write_pdf(path, packet)
+        paths.append(path)
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark PDF text extraction.")
+    parser.add_argument("--input", help="directory of PDFs (default: synthetic packets)")
+    parser.add_argument("--pdfs", type=int, default=48)
+    parser.add_argument("--pages", type=int, default=20, help="pages per synthetic PDF")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.input:
+            paths = sorted(os.path.join(args.input, n) for n in os.listdir(args.input) if n.lower().endswith(".pdf"))
+        else:
+            paths = synthetic_pdfs(tmp, args.pdfs, args.pages)
+        print(f"{len(paths)} PDFs, {os.cpu_count()} cores available")
+        for workers in args.workers:
+            text_dir = os.path.join(tmp, f"text-{workers}")
+            _, stats = extract_pdfs(paths, workers=workers, text_dir=text_dir, urls=({}, {}))
+            print(f"workers={workers:<3} {report(stats)}")
+        _, stats = extract_pdfs(paths, workers=args.workers[-1], text_dir=text_dir, urls=({}, {}))
+        print(f"re-run     {report(stats)}")
@@ -0,0 +1,64 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import threading
+import time
+
+from scrape import crawl_website
+
+#Stand-in site: page N links to its children, like a forms library with sub pages
+PAGE_COUNT = 300
+FANOUT = 6
+LATENCY = 0.02
+
+def make_page(n):
+    children = range(n * FANOUT + 1, min(n * FANOUT + FANOUT + 1, PAGE_COUNT))
+    links = "".join(f'<li><a href="/page/{c}">Form {c}</a></li>' for c in children)
+    return (f"<html><head><style>body{{}}</style></head><body><h3>Section {n}</h3>"
+            f"<p>Stand-in text for page {n}. " + "Lorem ipsum dolor sit amet. " * 40 +
+            f"</p><ul>{links}</ul></body></html>").encode()
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        try:
+            n = 0 if self.path == "/" else int(self.path.rsplit("/", 1)[-1])
+        except ValueError:
+            n = PAGE_COUNT
+        if n >= PAGE_COUNT:
+            self.send_error(404)
+            return
+        time.sleep(LATENCY)
+        body = make_page(n)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run(base_url, workers, depth, rate):
+    start = time.perf_counter()
+    pages = sum(1 for _ in crawl_website(base_url, workers=workers, max_depth=depth, rate=rate))
+    elapsed = time.perf_counter() - start
+    return pages, elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl a local stand-in site and report pages per second.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--rate", type=float, default=0, help="requests per second per host (0 = unlimited)")
+    args = parser.parse_args()
+
+    server = start_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+    print(f"Stand-in site: {PAGE_COUNT} pages, {LATENCY * 1000:.0f} ms latency, depth {args.depth}")
+    for workers in args.workers:
+        pages, elapsed = run(base_url, workers, args.depth, args.rate)
+        print(f"workers={workers:<3} pages={pages:<5} time={elapsed:6.2f}s  {pages / elapsed:7.1f} pages/s")
+    server.shutdown()
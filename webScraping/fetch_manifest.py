@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import threading
+
+#On-disk record of what every URL looked like last run (ETag, Last-Modified, sha256, size)
+#so re-runs can send conditional requests and skip bodies that did not change.
+
+class FetchManifest:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "not_modified": 0, "unchanged": 0, "changed": 0, "bytes_fetched": 0, "bytes_saved": 0}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"[WARNING] Ignoring unreadable manifest {path}: {e}")
+
+    def conditional_headers(self, url):
+        #If-None-Match / If-Modified-Since for a URL we have seen before
+        entry = self.entries.get(url, {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record_not_modified(self, url):
+        #Server answered 304, the cached copy is still good
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["not_modified"] += 1
+            self.stats["bytes_saved"] += self.entries.get(url, {}).get("size", 0)
+
+    def record_response(self, url, response, body):
+        #Stores validators and hash for a 200 response, returns True if the body changed
+        return self.record_download(url, response, hashlib.sha256(body).hexdigest(), len(body), len(body))
+
+    def record_download(self, url, response, digest, size, fetched):
+        #Same as record_response for bodies that were streamed to disk and hashed on the way
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["bytes_fetched"] += fetched
+            self.stats["bytes_saved"] += size - fetched
+            entry = self.entries.setdefault(url, {})
+            changed = entry.get("sha256") != digest
+            entry.update({
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "sha256": digest,
+                "size": size,
+            })
+            self.stats["changed" if changed else "unchanged"] += 1
+        return changed
+
+    def get(self, url, key, default=None):
+        return self.entries.get(url, {}).get(key, default)
+
+    def set(self, url, key, value):
+        with self.lock:
+            self.entries.setdefault(url, {})[key] = value
+
+    def forget(self, urls):
+        #Drops pages that are gone, so one that comes back is downloaded again instead of answered with a 304
+        with self.lock:
+            for url in urls:
+                self.entries.pop(url, None)
+
+    def save(self):
+        #Write to a temp file and rename so a crash never leaves a half-written manifest
+        tmp_path = self.path + ".tmp"
+        with self.lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def report(self):
+        s = self.stats
+        hits = s["not_modified"] + s["unchanged"]
+        ratio = hits / s["requests"] if s["requests"] else 0.0
+        return (f"{s['requests']} requests: {s['not_modified']} not modified, {s['unchanged']} unchanged, "
+                f"{s['changed']} changed | cache hit ratio {ratio:.1%} | "
+                f"{s['bytes_fetched'] / 1e6:.2f} MB fetched, {s['bytes_saved'] / 1e6:.2f} MB saved")
@@ -0,0 +1,101 @@
+from html.parser import HTMLParser
+from bs4 import BeautifulSoup
+
+#Pluggable HTML parsing for the scrapers. Every backend returns the same PageData:
+#  text     - visible text, like soup.get_text(separator=' ', strip=True) minus script/style/noscript
+#  links    - (href, link_text, h3_heading) for every <a href> inside <body>, in document order
+#  has_body - whether a <body> tag was found at all
+#"stream" is a single pass over the markup with no tree built, "lxml" and "html.parser" go through BeautifulSoup.
+BACKENDS = ("stream", "lxml", "html.parser")
+DEFAULT_BACKEND = "stream"
+SKIP_TAGS = {"script", "style", "noscript"}
+
+class PageData:
+    def __init__(self, text, links, has_body):
+        self.text = text
+        self.links = links
+        self.has_body = has_body
+
+class StreamExtractor(HTMLParser):
+    #SAX-style: links, the current <h3> and visible text are collected from the parser callbacks
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.text_parts = []
+        self.links = []
+        self.headings = ["General"]
+        self.has_body = False
+        self.in_body = False
+        self.skip_depth = 0
+        self.h3_depth = 0
+        self.open_links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag == "body":
+            self.has_body = self.in_body = True
+        elif tag == "h3" and self.in_body:
+            if self.h3_depth == 0:
+                self.headings.append("")
+            self.h3_depth += 1
+        elif tag == "a" and self.in_body:
+            href = dict(attrs).get("href")
+            if href is not None:
+                #Heading is stored as an index so a link inside an <h3> gets that heading's full text
+                link = [href, "", len(self.headings) - 1]
+                self.links.append(link)
+                self.open_links.append(link)
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag == "body":
+            self.in_body = False
+        elif tag == "h3" and self.h3_depth:
+            self.h3_depth -= 1
+        elif tag == "a" and self.open_links:
+            self.open_links.pop()
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        stripped = data.strip()
+        if not stripped:
+            return
+        self.text_parts.append(stripped)
+        if self.h3_depth:
+            self.headings[-1] += stripped
+        for link in self.open_links:
+            link[1] += stripped
+
+    def result(self):
+        links = [(href, text, self.headings[heading]) for href, text, heading in self.links]
+        return PageData(" ".join(self.text_parts), links, self.has_body)
+
+def extract_stream(html):
+    extractor = StreamExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.result()
+
+def extract_soup(html, features):
+    soup = BeautifulSoup(html, features)
+    body = soup.find("body")
+    links = []
+    if body:
+        current_h3 = "General"
+        for elem in body.find_all(["h3", "a"]):
+            if elem.name == "h3":
+                current_h3 = elem.get_text(strip=True)
+            elif elem.has_attr("href"):
+                links.append((elem["href"], elem.get_text(strip=True), current_h3))
+    for tag in soup(list(SKIP_TAGS)):
+        tag.decompose()
+    return PageData(soup.get_text(separator=" ", strip=True), links, body is not None)
+
+def extract_page(html, backend=DEFAULT_BACKEND):
+    if backend == "stream":
+        return extract_stream(html)
+    if backend in ("lxml", "html.parser"):
+        return extract_soup(html, backend)
+    raise ValueError(f"Unknown parser backend {backend!r}, expected one of {BACKENDS}")
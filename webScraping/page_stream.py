@@ -0,0 +1,32 @@
+import json
+
+#Scraped pages are stored as JSON Lines, one {url, fetched_at, fetch_seconds, text} record per line.
+#Writers flush after every record so a crashed crawl keeps everything scraped so far,
+#and readers yield one record at a time so cleaning/indexing never load the whole corpus.
+
+def write_pages(records, path, mode="w"):
+    #Streams records to `path` as they arrive, returns how many were written
+    count = 0
+    with open(path, mode, encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            count += 1
+    return count
+
+def read_pages(path):
+    #Lazily yields page records back out of a JSONL file, skipping a torn last line
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"[WARNING] Skipping unreadable line in {path}")
+
+def iter_page_text(path):
+    #Same stream as (url, text) pairs for steps that only care about the text
+    for record in read_pages(path):
+        yield record["url"], record["text"]
@@ -0,0 +1,191 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+import argparse
+import os
+import re
+import time
+
+from fetch_manifest import FetchManifest
+from page_stream import read_pages, write_pages
+from pdf_scraper import DOWNLOAD_DIR, MANIFEST_PATH, PDF_LINKS_PATH, file_sha256, load_pdf_links
+import telemetry
+
+#Turns the PDFs pdf_scraper.py saved into indexable chunks, one worker process per PDF.
+#Each PDF is read a page at a time and its words go through a rolling window, so a 300 page
+#packet never sits in memory as one string. Chunks are written to TEXT_DIR/<sha256>.jsonl:
+#  {"url", "file", "current_h3", "heading", "page", "text"}
+#current_h3 is the listing section the PDF was linked under (the filename prefix pdf_scraper.py gave it),
+#heading is the last heading-looking line inside the PDF, and text starts with both so retrieval sees them.
+#A PDF whose hash already has a chunk file is skipped, so re-runs only extract new or changed PDFs.
+#The merged OUTPUT_PATH is in the page_stream format local_index.py / page_dedup.py read.
+
+TEXT_DIR = os.path.join(DOWNLOAD_DIR, "text")
+OUTPUT_PATH = os.path.join(DOWNLOAD_DIR, "pdf_chunks.jsonl")
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 40
+MAX_HEADING_CHARS = 80
+HEADING_PATTERN = re.compile(r"^(?:[IVXLC]+|\d{1,2}|[A-Z])[.)]\s+[A-Z]")
+
+def is_heading(line):
+    #Short lines that are either ALL CAPS or numbered agenda items ("4. Approval of Minutes")
+    if not 3 <= len(line) <= MAX_HEADING_CHARS or line.endswith((".", ",", ";")):
+        return False
+    letters = [c for c in line if c.isalpha()]
+    return (len(letters) >= 3 and all(c.isupper() for c in letters)) or bool(HEADING_PATTERN.match(line))
+
+def listing_section(filename):
+    #"Board_Meeting_2023 - Minutes.pdf" -> "Board Meeting 2023"
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return stem.split(" - ", 1)[0].replace("_", " ") if " - " in stem else "General"
+
+class Chunker:
+    #Overlapping word windows that restart at every heading, so a chunk never spans two sections
+    def __init__(self, meta, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+        self.meta = meta
+        self.chunk_words = chunk_words
+        self.overlap = overlap
+        self.heading = ""
+        self.words = []
+        self.page = 1
+        self.fresh = 0
+
+    def chunk(self):
+        prefix = " > ".join(part for part in (self.meta["current_h3"], self.heading) if part)
+        return dict(self.meta, heading=self.heading, page=self.page, text=f"{prefix}: {' '.join(self.words)}")
+
+    def feed_line(self, line, page):
+        if is_heading(line):
+            yield from self.flush()
+            self.heading = line
+            self.words = []
+            self.fresh = 0
+        if not self.words:
+            self.page = page
+        for word in line.split():
+            self.words.append(word)
+            self.fresh += 1
+            if len(self.words) >= self.chunk_words:
+                yield self.chunk()
+                self.words = self.words[-self.overlap:]
+                self.fresh = 0
+                self.page = page
+
+    def flush(self):
+        #Only words the previous chunk did not already end with are worth a chunk of their own
+        if self.fresh:
+            yield self.chunk()
+        self.fresh = 0
+
+def iter_page_text(path):
+    #One page of text at a time; pypdf only parses a page's content stream when it is asked for
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    for number, page in enumerate(reader.pages, start=1):
+        try:
+            yield number, page.extract_text() or ""
+        except Exception as e:
+            print(f"[WARNING] Skipping page {number} of {path}: {e}")
+            yield number, ""
+
+def extract_pdf(path, url, text_dir=TEXT_DIR):
+    #Worker: hash the file, reuse its chunk file if one exists, otherwise stream pages into a new one.
+    #Returns (path, sha256, pages, chunks, seconds, cached).
+    start = time.perf_counter()
+    sha256 = file_sha256(path).hexdigest()
+    out_path = os.path.join(text_dir, f"{sha256}.jsonl")
+    if os.path.exists(out_path):
+        return path, sha256, 0, 0, time.perf_counter() - start, True
+
+    meta = {"url": url, "file": os.path.basename(path), "current_h3": listing_section(path)}
+    chunker = Chunker(meta)
+    pages = 0
+
+    def chunks():
+        nonlocal pages
+        for number, text in iter_page_text(path):
+            pages += 1
+            for line in text.splitlines():
+                line = line.strip()
+                if line:
+                    yield from chunker.feed_line(line, number)
+        yield from chunker.flush()
+
+    part_path = out_path + ".part"
+    count = write_pages(chunks(), part_path)
+    os.replace(part_path, out_path)
+    return path, sha256, pages, count, time.perf_counter() - start, False
+
+def source_urls(links_path=PDF_LINKS_PATH, manifest_path=MANIFEST_PATH):
+    #filename -> URL from the swept link list, plus sha256 -> URL from the download manifest
+    by_name, by_hash = {}, {}
+    if os.path.exists(links_path):
+        by_name = {filename: url for url, filename in load_pdf_links(links_path)}
+    if os.path.exists(manifest_path):
+        by_hash = {entry["sha256"]: url for url, entry in FetchManifest(manifest_path).entries.items() if entry.get("sha256")}
+    return by_name, by_hash
+
+def extract_pdfs(paths, workers=None, text_dir=TEXT_DIR, urls=None):
+    #Fans the PDFs out over a process pool; returns {path: sha256} for every PDF that extracted cleanly
+    os.makedirs(text_dir, exist_ok=True)
+    by_name, by_hash = urls if urls is not None else source_urls()
+    hashes = {}
+    stats = {"pdfs": 0, "cached": 0, "pages": 0, "chunks": 0, "cpu_seconds": 0.0, "failed": 0}
+    start = time.perf_counter()
+    with telemetry.span("extract_pdfs") as step, ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(extract_pdf, path, by_name.get(os.path.basename(path), ""), text_dir): path for path in paths}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="📄 Extracting PDFs", unit="pdf"):
+            try:
+                path, sha256, pages, chunks, seconds, cached = future.result()
+            except Exception as e:
+                print(f"[ERROR] Failed to extract {futures[future]}: {e}")
+                stats["failed"] += 1
+                continue
+            hashes[path] = sha256
+            stats["pdfs"] += 1
+            stats["cached"] += cached
+            stats["pages"] += pages
+            stats["chunks"] += chunks
+            stats["cpu_seconds"] += seconds
+        for key in ("pdfs", "cached", "pages", "chunks", "failed"):
+            step.add(key, stats[key])
+    stats["seconds"] = time.perf_counter() - start
+    stats["cores"] = min(workers or os.cpu_count(), os.cpu_count())
+    fill_missing_urls(hashes, by_name, by_hash, text_dir)
+    return hashes, stats
+
+def fill_missing_urls(hashes, by_name, by_hash, text_dir):
+    #Chunk files written before the URL was known (renamed PDF, link list saved later) get it now
+    for path, sha256 in hashes.items():
+        url = by_name.get(os.path.basename(path)) or by_hash.get(sha256)
+        chunk_path = os.path.join(text_dir, f"{sha256}.jsonl")
+        first = next(read_pages(chunk_path), None)
+        if url and first is not None and not first["url"]:
+            records = [dict(record, url=url) for record in read_pages(chunk_path)]
+            write_pages(records, chunk_path)
+
+def merge_chunks(hashes, output_path=OUTPUT_PATH, text_dir=TEXT_DIR):
+    #One JSONL of every current PDF's chunks, in filename order
+    def records():
+        for path in sorted(hashes):
+            yield from read_pages(os.path.join(text_dir, f"{hashes[path]}.jsonl"))
+    return write_pages(records(), output_path)
+
+def report(stats):
+    processed = stats["pdfs"] - stats["cached"]
+    rate = stats["pages"] / stats["seconds"] if stats["seconds"] else 0.0
+    return (f"{processed} PDFs extracted ({stats['cached']} unchanged, {stats['failed']} failed), "
+            f"{stats['pages']} pages -> {stats['chunks']} chunks in {stats['seconds']:.1f}s: "
+            f"{rate:.1f} pages/s, {rate / stats['cores']:.1f} pages/s per core")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract downloaded PDFs into heading-aware text chunks.")
+    parser.add_argument("--input", default=DOWNLOAD_DIR, help="directory of PDFs")
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    args = parser.parse_args()
+
+    paths = sorted(os.path.join(args.input, name) for name in os.listdir(args.input) if name.lower().endswith(".pdf"))
+    print(f"🔍 {len(paths)} PDFs in '{args.input}'")
+    hashes, stats = extract_pdfs(paths, workers=args.workers)
+    print(report(stats))
+    print(f"✅ {merge_chunks(hashes, args.output)} chunks written to '{args.output}'")
@@ -1,13 +1,25 @@
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin, urlparse, urlunparse, parse_qs, urlencode
 from tqdm import tqdm
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import argparse
+import hashlib
+import json
 import os
 import re
 
+from fetch_manifest import FetchManifest
+from html_extract import BACKENDS, DEFAULT_BACKEND, extract_page
+from scrape import fetch_html, make_session
+# importable once scrape.py has put the repository root on sys.path
+import telemetry
+
 #CODE best works in Local Computer Env as it downloads PDFs to local downloads dir
 # Output folder
 DOWNLOAD_DIR = "downloaded_pdfs"
+MANIFEST_PATH = os.path.join(DOWNLOAD_DIR, "manifest.json")
+PDF_LINKS_PATH = os.path.join(DOWNLOAD_DIR, "pdf_links.json")
+CHUNK_SIZE = 64 * 1024
 os.makedirs(DOWNLOAD_DIR, exist_ok=True)
 
 def is_valid_url(url):
@@ -17,60 +29,303 @@ def is_valid_url(url):
 def sanitize_filename(text):
     return re.sub(r'[\\/*?:"<>|]', "", text).strip().replace(" ", "_")[:150]
 
-def get_pdf_links_with_titles(base_url):
-    try:
-        response = requests.get(base_url, timeout=10)
-        soup = BeautifulSoup(response.text, "html.parser")
-        body = soup.find("body")
-        if not body:
-            print("[WARNING] No <body> tag found.")
-            return []
-
-        pdf_links = []
-        current_h3 = "General"
-
-        for elem in body.descendants:
-            if elem.name == "h3":
-                current_h3 = elem.get_text(strip=True)
-
-            if elem.name == "a" and elem.has_attr("href") and elem["href"].lower().endswith(".pdf"):
-                pdf_url = urljoin(base_url, elem["href"])
-                if not is_valid_url(pdf_url):
-                    continue
+def page_pdf_links(page, base_url):
+    #(pdf_url, filename) pairs from an already parsed page, named after the <h3> section they sit under
+    pdf_links = []
+    for href, link_text, current_h3 in page.links:
+        if not href.lower().endswith(".pdf"):
+            continue
+        pdf_url = urljoin(base_url, href)
+        if not is_valid_url(pdf_url):
+            continue
 
-                link_text = elem.get_text(strip=True) or "untitled"
-                prefix = sanitize_filename(current_h3)
-                title = sanitize_filename(link_text)
-                filename = f"{prefix} - {title}.pdf"
+        prefix = sanitize_filename(current_h3)
+        title = sanitize_filename(link_text or "untitled")
+        filename = f"{prefix} - {title}.pdf"
 
-                pdf_links.append((pdf_url, filename))
+        pdf_links.append((pdf_url, filename))
 
-        return pdf_links
+    return pdf_links
 
+def parse_pdf_links(html, base_url, parser=DEFAULT_BACKEND):
+    page = extract_page(html, parser)
+    if not page.has_body:
+        print("[WARNING] No <body> tag found.")
+        return []
+    return page_pdf_links(page, base_url)
+
+def get_pdf_links_with_titles(base_url, parser=DEFAULT_BACKEND):
+    try:
+        response = requests.get(base_url, timeout=10)
+        return parse_pdf_links(response.text, base_url, parser)
     except Exception as e:
         print(f"[ERROR] Failed to extract PDF links from {base_url}: {e}")
         return []
 
-def download_pdfs(pdf_links):
-    for url, filename in tqdm(pdf_links, desc="📥 Downloading PDFs"):
-        path = os.path.join(DOWNLOAD_DIR, filename)
-        try:
-            response = requests.get(url, timeout=15)
-            response.raise_for_status()
-            with open(path, 'wb') as f:
-                f.write(response.content)
-        except Exception as e:
-            print(f"[ERROR] Failed to download {url}: {e}")
+def page_url(base_url, page):
+    #Same listing URL with its ?page= query set to `page`
+    parsed = urlparse(base_url)
+    query = {k: v for k, v in parse_qs(parsed.query).items() if k != "page"}
+    query["page"] = [str(page)]
+    return urlunparse(parsed._replace(query=urlencode(query, doseq=True)))
+
+def last_page_number(page, base_url):
+    #Highest ?page=N the pager on this listing page links to (0 if there is no pager)
+    path = urlparse(base_url).path
+    last = 0
+    for href, _, _ in page.links:
+        parsed = urlparse(urljoin(base_url, href))
+        pages = parse_qs(parsed.query).get("page")
+        if parsed.path == path and pages and pages[0].isdigit():
+            last = max(last, int(pages[0]))
+    return last
+
+def parse_listing_page(html, base_url, parser=DEFAULT_BACKEND):
+    #Process-pool worker: one parse per page gives both the PDF links and how far the pager goes
+    page = extract_page(html, parser)
+    return page_pdf_links(page, base_url), last_page_number(page, base_url)
+
+def merge_pdf_links(pages):
+    #Merges per-page results in page order, keeping the first copy of each URL.
+    #Repeated filenames get " (2)", " (3)", ... so the same archive always maps to the same names.
+    merged = []
+    seen_urls = set()
+    used_names = set()
+    for pdf_links in pages:
+        for url, filename in pdf_links:
+            if url in seen_urls:
+                continue
+            seen_urls.add(url)
+            stem, ext = os.path.splitext(filename)
+            name = filename
+            n = 2
+            while name.lower() in used_names:
+                name = f"{stem} ({n}){ext}"
+                n += 1
+            used_names.add(name.lower())
+            merged.append((url, name))
+    return merged
+
+def sweep_listing_pages(base_url, workers=4, parser=DEFAULT_BACKEND):
+    #Fetches every ?page=N of a paginated listing on a thread pool and parses them on a process pool.
+    #The pager is re-read from each batch, so pagers that only show a window of pages are followed too.
+    session = make_session(workers)
+    results = {}
+    last_page = 0
+    pending = [0]
+
+    with ThreadPoolExecutor(max_workers=workers) as fetch_pool, ProcessPoolExecutor(max_workers=workers) as parse_pool:
+        while pending:
+            fetches = {fetch_pool.submit(fetch_html, page_url(base_url, n), session): n for n in pending}
+            parses = {}
+            for future in tqdm(as_completed(fetches), total=len(fetches), desc="📄 Listing pages"):
+                n = fetches[future]
+                html, _, _ = future.result()
+                if html is None:
+                    results[n] = []
+                    continue
+                parses[parse_pool.submit(parse_listing_page, html, page_url(base_url, n), parser)] = n
+
+            for future in as_completed(parses):
+                n = parses[future]
+                results[n], last = future.result()
+                last_page = max(last_page, last)
+
+            pending = [n for n in range(last_page + 1) if n not in results]
+
+    return merge_pdf_links(results[n] for n in sorted(results))
+
+def save_pdf_links(pdf_links, path):
+    #The list the downloader consumes: [{"url": ..., "filename": ...}, ...]
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump([{"url": url, "filename": filename} for url, filename in pdf_links], f, indent=1)
+    os.replace(tmp_path, path)
+
+def load_pdf_links(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [(item["url"], item["filename"]) for item in json.load(f)]
+
+def file_sha256(path, chunk_size=CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest
+
+def is_current(path, url, manifest):
+    #A file on disk whose size and hash match what the manifest recorded for its URL
+    if not manifest or not os.path.exists(path):
+        return False
+    size = manifest.get(url, "size")
+    if size is None or os.path.getsize(path) != size:
+        return False
+    return file_sha256(path).hexdigest() == manifest.get(url, "sha256")
+
+def download_pdf(url, path, session=None, manifest=None, progress=None):
+    #Streams one PDF into `path`.part in chunks, resuming it with a Range request if a
+    #previous run died halfway, then renames it into place. Returns True if the file changed.
+    with telemetry.span("download_pdf") as step:
+        step.set("url", url)
+        changed = fetch_pdf(url, path, session, manifest, progress, step)
+        step.add("changed" if changed else "unchanged")
+    return changed
+
+def range_total(response):
+    #Full size from a Content-Range header ("bytes */12345" on a 416), None if the server sent none
+    total = response.headers.get("Content-Range", "").rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+class StoredValidator:
+    #Stands in for the response a .part was downloaded under, for record_download: a 416 carries no
+    #ETag or Last-Modified of its own. ETags are quoted, HTTP dates are not.
+    def __init__(self, validator):
+        self.headers = {"ETag" if validator.startswith(('"', 'W/"')) else "Last-Modified": validator}
+
+def fetch_pdf(url, path, session, manifest, progress, step):
+    part_path = path + ".part"
+    current = is_current(path, url, manifest)
+    if current and not manifest.conditional_headers(url):
+        manifest.record_not_modified(url)
+        step.set("status", "cached")
+        return False
+
+    restarted = False
+    while True:
+        headers = manifest.conditional_headers(url) if current else {}
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        partial = manifest.get(url, "partial") if manifest else None
+        if offset and not current:
+            if partial:
+                headers["Range"] = f"bytes={offset}-"
+                headers["If-Range"] = partial
+            else:
+                #Without a validator the server cannot tell us the file changed, and a resumed
+                #body could be spliced from two versions of it: start over instead
+                os.remove(part_path)
+                offset = 0
+
+        restart = False
+        with (session or requests).get(url, timeout=15, headers=headers, stream=True) as response:
+            step.set("status", response.status_code)
+            if response.status_code == 304 and manifest:
+                manifest.record_not_modified(url)
+                return False
+
+            validated_by = response
+            fetched = 0
+            if response.status_code == 416 and offset and not restarted:
+                #Nothing past the end of the .part: either it already holds the whole file (an earlier
+                #run died before the rename) or the file shrank upstream and has to be fetched again
+                total = range_total(response)
+                if total is None and manifest:
+                    total = manifest.get(url, "size")
+                if total == offset:
+                    digest = file_sha256(part_path)
+                    validated_by = StoredValidator(partial)
+                else:
+                    restart = True
+            else:
+                #Also raises a second 416, so a server that keeps answering 416 is retried only once
+                response.raise_for_status()
+                if response.status_code == 206:
+                    digest = file_sha256(part_path)
+                    mode = "ab"
+                else:
+                    digest = hashlib.sha256()
+                    offset = 0
+                    mode = "wb"
+                    if manifest:
+                        manifest.set(url, "partial", response.headers.get("ETag") or response.headers.get("Last-Modified"))
+
+                with open(part_path, mode) as f:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        fetched += len(chunk)
+                        if progress is not None:
+                            progress.update(len(chunk))
+        if not restart:
+            break
+        restarted = True
+        os.remove(part_path)
+        if manifest:
+            manifest.set(url, "partial", None)
+    step.add("bytes", fetched)
+
+    size = offset + fetched
+    if manifest:
+        manifest.set(url, "partial", None)
+        changed = manifest.record_download(url, validated_by, digest.hexdigest(), size, fetched)
+        if not changed and os.path.exists(path):
+            os.remove(part_path)
+            return False
+    os.replace(part_path, path)
+    return True
+
+def download_pdfs(pdf_links, manifest=None, workers=4):
+    #Downloads on a bounded thread pool, one shared byte-based bar shows aggregate throughput
+    #Returns the (url, path) pairs that were new or changed, unchanged PDFs are skipped via the manifest
+    changed = []
+    session = make_session(workers)
+    with telemetry.span("download_pdfs") as step, tqdm(desc="📥 Downloading PDFs", unit="B", unit_scale=True, unit_divisor=1024) as progress:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            submitted = set()
+            for url, filename in pdf_links:
+                path = os.path.join(DOWNLOAD_DIR, filename)
+                #Two downloads into one .part would overwrite each other's bytes
+                if path.lower() in submitted:
+                    print(f"[WARNING] Skipping {url}: '{filename}' is already being downloaded")
+                    step.add("skipped")
+                    continue
+                submitted.add(path.lower())
+                futures[pool.submit(download_pdf, url, path, session, manifest, progress)] = (url, path)
+
+            done = 0
+            for future in as_completed(futures):
+                url, path = futures[future]
+                done += 1
+                progress.set_postfix(files=f"{done}/{len(futures)}")
+                try:
+                    if future.result():
+                        changed.append((url, path))
+                except Exception as e:
+                    print(f"[ERROR] Failed to download {url}: {e}")
+                    step.add("failed")
+        step.add("files", len(futures))
+        step.add("changed", len(changed))
+    return changed
 
 if __name__ == "__main__":
-    BASE_URL = "https://www.humboldt.edu/research/board/meetings-minutes-agendas?page=4"
-    print(f"🔍 Searching for PDFs at: {BASE_URL}")
+    parser = argparse.ArgumentParser(description="Download the PDFs linked from a listing page.")
+    parser.add_argument("--url", default="https://www.humboldt.edu/research/board/meetings-minutes-agendas?page=4")
+    parser.add_argument("--workers", type=int, default=4, help="number of pages/PDFs fetched at once")
+    parser.add_argument("--all-pages", action="store_true", help="sweep every ?page=N of the listing, not just --url")
+    parser.add_argument("--links-file", default=PDF_LINKS_PATH, help="where the swept (url, filename) list is written")
+    parser.add_argument("--parser", choices=BACKENDS, default=DEFAULT_BACKEND, help="HTML parser backend")
+    parser.add_argument("--from-links-file", action="store_true", help="download from an earlier --links-file instead of scanning")
+    args = parser.parse_args()
 
-    pdf_links = get_pdf_links_with_titles(BASE_URL)
+    if args.from_links_file:
+        pdf_links = load_pdf_links(args.links_file)
+    elif args.all_pages:
+        print(f"🔍 Sweeping every listing page of: {args.url}")
+        pdf_links = sweep_listing_pages(args.url, workers=args.workers, parser=args.parser)
+        save_pdf_links(pdf_links, args.links_file)
+        print(f"📝 Link list written to '{args.links_file}'")
+    else:
+        print(f"🔍 Searching for PDFs at: {args.url}")
+        pdf_links = merge_pdf_links([get_pdf_links_with_titles(args.url, parser=args.parser)])
     print(f"🔗 Found {len(pdf_links)} PDF links.")
 
     if pdf_links:
-        download_pdfs(pdf_links)
-        print(f"✅ Done. PDFs saved in '{DOWNLOAD_DIR}'")
+        manifest = FetchManifest(MANIFEST_PATH)
+        try:
+            changed = download_pdfs(pdf_links, manifest, workers=args.workers)
+        finally:
+            manifest.save()
+        print(f"✅ Done. {len(changed)} new or changed PDFs saved in '{DOWNLOAD_DIR}'")
+        print(manifest.report())
     else:
         print("⚠️ No PDFs found.")
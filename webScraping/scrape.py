@@ -1,74 +1,269 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 from urllib.parse import urljoin, urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
+from datetime import datetime, timezone
+import argparse
+import os
+import sys
+import threading
 import time
 
+# telemetry.py lives in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import telemetry
+from fetch_manifest import FetchManifest
+from html_extract import BACKENDS, DEFAULT_BACKEND, extract_page
+from page_stream import read_pages, write_pages
+
+OUTPUT_PATH = "humboldt_body_links_text.jsonl"
+MANIFEST_PATH = "scrape_manifest.json"
+GONE_STATUSES = (404, 410)
+
 def is_valid_url(url):
     #Takes URL if its valid or not
     parsed = urlparse(url)
     return bool(parsed.netloc) and bool(parsed.scheme)
 
-def get_body_links(base_url):
+def make_session(pool_size=10):
+    #One keep-alive session shared by all crawl workers, pool sized to the worker count
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+class TokenBucket:
+    #Refills `rate` tokens per second up to `capacity`, acquire() blocks until a token is free
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class HostThrottle:
+    #Keeps one token bucket per host so a slow rate on one site does not hold up the others
+    def __init__(self, rate=1.0, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.rate:
+            return
+        host = urlparse(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        bucket.acquire()
+
+def fetch_html(url, session=None, manifest=None):
+    #Downloads a page and returns (html, changed, status)
+    #html is None for errors, non-HTML responses and pages the manifest says are unchanged
+    #status is the HTTP status code, None when no response came back at all
+    headers = manifest.conditional_headers(url) if manifest else {}
+    try:
+        response = (session or requests).get(url, timeout=10, headers=headers)
+        if response.status_code == 304 and manifest:
+            manifest.record_not_modified(url)
+            telemetry.count("fetch_not_modified", kind="page")
+            return None, False, 304
+        response.raise_for_status()
+    except Exception as e:
+        print(f"[ERROR] Failed to fetch {url}: {e}")
+        telemetry.count("fetch_errors", kind="page")
+        return None, True, getattr(getattr(e, "response", None), "status_code", None)
+    telemetry.count("fetch_bytes", len(response.content), kind="page")
+    if "html" not in response.headers.get("Content-Type", "text/html"):
+        return None, True, response.status_code
+    if manifest and not manifest.record_response(url, response, response.content):
+        return None, False, response.status_code
+    return response.text, True, response.status_code
+
+def page_body_links(page, base_url):
+    #Same-site links from the <body> of an already parsed page
+    links = set()
+    for href, _, _ in page.links:
+        full_url = urljoin(base_url, href).split("#")[0]
+        if is_valid_url(full_url) and urlparse(full_url).netloc == urlparse(base_url).netloc:
+            links.add(full_url)
+    return links
+
+def get_body_links(base_url, html=None, session=None, parser=DEFAULT_BACKEND):
     #Goes into Body tag of HTML and replaces inside content of the Body Tag
     try:
-        response = requests.get(base_url, timeout=10)
-        soup = BeautifulSoup(response.text, "html.parser")
-        body = soup.find("body")
-        if not body:
+        if html is None:
+            response = (session or requests).get(base_url, timeout=10)
+            html = response.text
+        page = extract_page(html, parser)
+        if not page.has_body:
             print("[WARNING] No <body> tag found.")
             return set()
-
-        links = set()
-        for a_tag in body.find_all("a", href=True):
-            href = a_tag["href"]
-            full_url = urljoin(base_url, href)
-            if is_valid_url(full_url) and urlparse(full_url).netloc == urlparse(base_url).netloc:
-                links.add(full_url)
-        return links
+        return page_body_links(page, base_url)
     except Exception as e:
         print(f"[ERROR] Failed to get body links from {base_url}: {e}")
         return set()
 
-def get_visible_text(url):
+def get_visible_text(url, html=None, session=None, parser=DEFAULT_BACKEND):
     #Goes check the URL and scrapes the name inside URL
     try:
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.text, "html.parser")
-        for tag in soup(["script", "style", "noscript"]):
-            tag.decompose()
-        text = soup.get_text(separator=' ', strip=True)
-        return text
+        if html is None:
+            response = (session or requests).get(url, timeout=10)
+            html = response.text
+        return extract_page(html, parser).text
     except Exception as e:
         print(f"[ERROR] Failed to get text from {url}: {e}")
         return ""
 
-def scrape_website(base_url):
-    #Creates the Web Applcation
-    visited = set()
-    all_text = ""
-
-    print(f"Scanning {base_url} for links in <body>...")
-    links = get_body_links(base_url)
-    links.add(base_url)
-
-    print("Found {len(links)} pages to visit.")
-    for link in tqdm(links):
-        if link not in visited:
-            visited.add(link)
-            page_text = get_visible_text(link)
-            if page_text:
-                all_text += f"\n\n---\n {link}\n{page_text}"
-            time.sleep(1)
-    return all_text
+def crawl_page(url, follow_links, session=None, throttle=None, manifest=None, parser=DEFAULT_BACKEND):
+    #Per-page stages: fetch once, parse once, then take the visible text and (if not at max depth) the body links
+    #Unchanged pages produce no text, their links come from the manifest so the crawl still goes deeper
+    #Returns (record, links, status); status is None when the page's links could not be read
+    if throttle:
+        throttle.wait(url)
+    fetched_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    start = time.perf_counter()
+    with telemetry.span("fetch_page") as step:
+        step.set("url", url)
+        html, changed, status = fetch_html(url, session, manifest)
+    record = {"url": url, "fetched_at": fetched_at, "fetch_seconds": round(time.perf_counter() - start, 3), "text": ""}
+    if not changed:
+        return record, set(manifest.get(url, "links", [])) if follow_links else set(), status
+    if html is None:
+        return record, set(), status
+    try:
+        with telemetry.span("parse_page", parser=parser):
+            page = extract_page(html, parser)
+    except Exception as e:
+        print(f"[ERROR] Failed to parse {url}: {e}")
+        return record, set(), None
+    record["text"] = page.text
+    links = page_body_links(page, url)
+    if manifest:
+        manifest.set(url, "links", sorted(links))
+    return record, links if follow_links else set(), status
 
-if __name__ == "__main__":
-    BASE_URL = "https://www.humboldt.edu/research/z-forms-library"
-    scraped_text = scrape_website(BASE_URL)
+def crawl_website(base_url, workers=8, max_depth=1, rate=1.0, burst=1, max_pages=None, manifest=None, parser=DEFAULT_BACKEND, crawl=None):
+    #Breadth-first crawl on a thread pool, yields a page record as each page finishes
+    #max_depth=1 visits the base page and the links on it, like the original scrape
+    #`crawl`, if given, is filled with what merge_pages needs to tell a gone page from an unchanged one:
+    #  visited - every URL fetched, gone - URLs answered with 404/410,
+    #  complete - False if max_pages cut the crawl short or a page failed, so its links are unknown
+    session = make_session(workers)
+    throttle = HostThrottle(rate, burst)
+    visited = {base_url}
+    frontier = [base_url]
+    depth = 0
+    crawl = {} if crawl is None else crawl
+    crawl.update(visited=visited, gone=set(), complete=True)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while frontier:
+            follow_links = depth < max_depth
+            futures = [pool.submit(crawl_page, url, follow_links, session, throttle, manifest, parser) for url in frontier]
+            next_frontier = []
+            for future in as_completed(futures):
+                record, links, status = future.result()
+                if status in GONE_STATUSES:
+                    crawl["gone"].add(record["url"])
+                elif status is None or status >= 400:
+                    crawl["complete"] = False
+                if record["text"]:
+                    yield record
+                for link in sorted(links):
+                    if max_pages is not None and len(visited) >= max_pages:
+                        crawl["complete"] = False
+                        break
+                    if link not in visited:
+                        visited.add(link)
+                        next_frontier.append(link)
+            frontier = next_frontier
+            depth += 1
 
-    with open("humboldt_body_links_text.txt", "w", encoding="utf-8") as f:
-        f.write(scraped_text)
+def scrape_website(base_url, workers=1, max_depth=1, rate=1.0, max_pages=None, manifest=None, parser=DEFAULT_BACKEND, crawl=None):
+    #Generator of page records {url, fetched_at, fetch_seconds, text}, nothing is held back in memory
+    #With a manifest only new or changed pages are yielded
+    print(f"Scanning {base_url} (workers={workers}, depth={max_depth}, {rate} req/s per host)...")
+    pages = crawl_website(base_url, workers=workers, max_depth=max_depth, rate=rate, max_pages=max_pages, manifest=manifest, parser=parser, crawl=crawl)
+    with telemetry.span("scrape_website") as step:
+        for record in tqdm(pages, unit="page"):
+            step.add("pages")
+            step.add("text_chars", len(record["text"]))
+            yield record
 
-    print("'humboldt_body_links_text.txt'")
+def merge_pages(crawled_path, path, crawl):
+    #Folds the pages a crawl wrote to `crawled_path` into the full corpus at `path`, one record per URL.
+    #Pages the crawl did not re-send (unchanged, or failed this time) keep their old record; a page is
+    #only dropped when it answered 404/410 or a complete crawl no longer reaches it.
+    #Returns (pages in the corpus, URLs dropped)
+    crawled = {record["url"] for record in read_pages(crawled_path)}
+    dropped = set()
 
+    def kept():
+        if not os.path.exists(path):
+            return
+        for record in read_pages(path):
+            url = record["url"]
+            if url in crawl["gone"] or (crawl["complete"] and url not in crawl["visited"]):
+                dropped.add(url)
+            elif url not in crawled:
+                yield record
+
+    tmp_path = path + ".tmp"
+    count = write_pages(kept(), tmp_path)
+    count += write_pages(read_pages(crawled_path), tmp_path, mode="a")
+    os.replace(tmp_path, path)
+    os.remove(crawled_path)
+    return count, dropped
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape visible text from a site and the pages it links to.")
+    parser.add_argument("--url", default="https://www.humboldt.edu/research/z-forms-library")
+    parser.add_argument("--workers", type=int, default=1, help="number of pages fetched at once")
+    parser.add_argument("--depth", type=int, default=1, help="how many hops of links to follow from the base page")
+    parser.add_argument("--rate", type=float, default=1.0, help="requests per second per host (0 = unlimited)")
+    parser.add_argument("--max-pages", type=int, default=None)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="where ETags and content hashes are kept between runs")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and re-download every page")
+    parser.add_argument("--parser", choices=BACKENDS, default=DEFAULT_BACKEND, help="HTML parser backend")
+    args = parser.parse_args()
+
+    manifest = None if args.full else FetchManifest(args.manifest)
+    if manifest and not os.path.exists(args.output):
+        #Unchanged pages are only kept in the output, without it every page has to be downloaded again
+        manifest.forget(list(manifest.entries))
+    crawl = {"visited": set(), "gone": set(), "complete": False}
+    crawled_path = args.output + ".crawl"
+    pages = scrape_website(args.url, workers=args.workers, max_depth=args.depth, rate=args.rate, max_pages=args.max_pages, manifest=manifest, parser=args.parser, crawl=crawl)
+    finished = False
+    try:
+        count = write_pages(pages, crawled_path)
+        finished = True
+    finally:
+        #An interrupted crawl still keeps what it fetched, but says nothing about the pages it did not reach
+        crawl["complete"] = crawl["complete"] and finished
+        total, dropped = merge_pages(crawled_path, args.output, crawl)
+        if manifest:
+            manifest.forget(dropped | crawl["gone"])
+            manifest.save()
 
+    print(f"{count} new or changed pages, {len(dropped)} gone pages removed, {total} pages in '{args.output}'")
+    if manifest:
+        print(manifest.report())